@@ -1,48 +1,157 @@
-from typing import List
+import os
+import threading
+from typing import List, Tuple
+
+import numpy as np
 
 from monopoly.board import Board
 
 
+class Counters:
+    __slots__ = ('bids', 'money', 'trades', 'wins')
+
+    def __init__(self):
+        # plain lists: single-element increments on them are much cheaper than on numpy arrays
+        self.bids: List[int] = [0] * 40
+        self.money: List[int] = [0] * 40
+        self.trades: List[int] = [0] * 40
+        self.wins: List[int] = [0] * 40
+
+    def drain(self):
+        counters = np.array((self.bids, self.money, self.trades, self.wins), dtype=np.int64)
+        self.__init__()
+        return counters
+
+
 class Analytics:
     instance = None
 
+    COSTS = np.array(Board.COSTS, dtype=np.float64)
+
     def __new__(cls):
         if cls.instance is None:
             cls.instance = super().__new__(cls)
         return cls.instance
 
     def __init__(self):
-        self.bids: List[int] = [0] * 40
-        self.money: List[int] = [0] * 40
-        self.average: List[float] = [0.0] * 40
-        self.price: List[float] = [0.0] * 40
+        self.bids = np.zeros(40, dtype=np.int64)
+        self.money = np.zeros(40, dtype=np.int64)
+        self.trades = np.zeros(40, dtype=np.int64)
+        self.exchanges = np.zeros(40, dtype=np.int64)
+        self.wins = np.zeros(40, dtype=np.int64)
 
-        self.trades: List[int] = [0] * 40
-        self.exchanges: List[int] = [0] * 40
+        # every thread counts into its own buffer; buffers are only folded in between batches
+        self.local = threading.local()
+        self.buffers: List[Tuple[threading.Thread, Counters]] = []
 
-        self.wins: List[int] = [0] * 40
-        self.max: int = 0
-        self.min: int = 0
-        self.ratio: List[float] = [0.0] * 40
+        self.derived = None
+
+    def counters(self) -> Counters:
+        buffer = getattr(self.local, 'counters', None)
+        if buffer is None:
+            buffer = self.local.counters = Counters()
+            self.buffers.append((threading.current_thread(), buffer))
+        return buffer
 
     def make_bid(self, index, bid):
-        self.bids[index] += 1
-        self.money[index] += bid
-        self.average[index] = self.money[index] / self.bids[index]
-        self.price[index] = self.average[index] / Board.COSTS[index]
+        buffer = self.counters()
+        buffer.bids[index] += 1
+        buffer.money[index] += bid
 
     def made_trade(self, index):
-        self.trades[index] += 1
+        self.counters().trades[index] += 1
 
     def mark_win(self, index):
-        self.wins[index] += 1
+        self.counters().wins[index] += 1
+
+    def collect(self):
+        counters = np.zeros((4, 40), dtype=np.int64)
+
+        for thread, buffer in self.buffers:
+            counters += buffer.drain()
+
+        # buffers of threads that have finished are empty now and will never be written again
+        self.buffers = [(thread, buffer) for thread, buffer in self.buffers if thread.is_alive()]
+
+        return counters
+
+    def merge(self, counters):
+        bids, money, trades, wins = counters
+
+        self.bids += bids
+        self.money += money
+        self.trades += trades
+        self.wins += wins
+
+        self.derived = None
+
+    def refresh(self):
+        # counts made in this process that were never collected belong to the totals too
+        if any(any(buffer.bids) or any(buffer.trades) or any(buffer.wins) for thread, buffer in self.buffers):
+            self.merge(self.collect())
+
+        if self.derived is not None:
+            return self.derived
+
+        average = np.divide(self.money, self.bids, out=np.zeros(40), where=self.bids > 0)
+        price = np.divide(average, self.COSTS, out=np.zeros(40), where=self.COSTS > 0)
+
+        won = self.wins[self.wins > 0]
+        high = int(self.wins.max())
+        low = int(won.min()) if len(won) else 0
+        ratio = np.zeros(40)
+        if high > low:
+            np.divide(self.wins - low, high - low, out=ratio, where=self.wins > 0)
+
+        self.derived = (average, price, ratio, high, low)
+        return self.derived
+
+    @property
+    def average(self) -> np.ndarray:
+        return self.refresh()[0]
+
+    @property
+    def price(self) -> np.ndarray:
+        return self.refresh()[1]
+
+    @property
+    def ratio(self) -> np.ndarray:
+        return self.refresh()[2]
+
+    @property
+    def max(self) -> int:
+        return self.refresh()[3]
+
+    @property
+    def min(self) -> int:
+        return self.refresh()[4]
+
+
+class History:
+    COUNTS = ('bids', 'money', 'trades', 'wins')
+    COLUMNS = ['generation', 'bracket', 'games'] + [f"{name}_{i}" for name in COUNTS for i in range(40)]
+
+    def __init__(self, directory):
+        # one row per bracket: where it was played, how many games, then the four counters for every tile
+        self.directory = directory
+        self.rows: List[np.ndarray] = []
+
+    def append(self, generation, bracket, games, counters):
+        self.rows.append(np.concatenate(([generation, bracket, games], np.asarray(counters).ravel())))
+
+    def flush(self, chunk):
+        if not self.rows:
+            return
 
-        if self.max < self.wins[index]:
-            self.max = self.wins[index]
+        rows = np.array(self.rows, dtype=np.int64)
+        self.rows = []
 
-        temp_min = float('inf')
+        os.makedirs(self.directory, exist_ok=True)
+        np.save(os.path.join(self.directory, f"{chunk}.npy"), rows)
 
-        for i in range(40):
-            if self.wins[i] != 0 and self.wins[i] < temp_min:
-                temp_min = self.wins[i]
-        self.ratio[index] = (self.wins[index] - temp_min) / (self.max - temp_min)
+        path = os.path.join(self.directory, "history.csv")
+        fresh = not os.path.exists(path)
+        with open(path, "a") as file:
+            if fresh:
+                file.write(",".join(self.COLUMNS) + "\n")
+            np.savetxt(file, rows, fmt="%d", delimiter=",")
@@ -0,0 +1,124 @@
+import mmap
+import os
+import struct
+from typing import Dict, List, Tuple
+
+from checkpoint import Checkpoint
+from neuro_evolution.genotype import Genotype
+
+
+class Archive:
+    MAGIC = b'MNGA'
+
+    RECORD = struct.Struct('<4siII')  # magic, generation, species, genomes
+    SPECIES = struct.Struct('<dIII')  # top fitness, staleness, first genome, members
+    GENOME = struct.Struct('<QIId')  # file offset, vertices, edges, fitness
+    INDEX = struct.Struct('<iQQ')  # generation, record offset, record length
+
+    def __init__(self, path):
+        self.path = path
+        self.index_path = path + ".index"
+        self.entries: Dict[int, Tuple[int, int]] = {}
+        self.indexed = 0
+        self.file = None
+        self.map = None
+
+    def append(self, generation, species):
+        # the record is complete on disk before the index points at it, so a torn append is never visible
+        with open(self.path, "ab") as file:
+            start = file.seek(0, os.SEEK_END)
+
+            members = [genotype for s in species for genotype in s.members]
+            table = start + self.RECORD.size + self.SPECIES.size * len(species) + self.GENOME.size * len(members)
+
+            header = [self.RECORD.pack(self.MAGIC, generation, len(species), len(members))]
+            first = 0
+            for s in species:
+                header.append(self.SPECIES.pack(s.topFitness, s.staleness, first, len(s.members)))
+                first += len(s.members)
+
+            body = []
+            offset = table
+            for genotype in members:
+                columns = genotype.pack()
+                header.append(self.GENOME.pack(offset, len(genotype.indices), len(genotype.innovations),
+                                               genotype.fitness))
+                body.extend(columns)
+                offset += sum(len(column) for column in columns)
+
+            file.write(b''.join(header))
+            file.write(b''.join(body))
+            file.flush()
+            os.fsync(file.fileno())
+
+        with open(self.index_path, "ab") as file:
+            # a torn entry left by a crash would misalign every entry after it
+            end = file.seek(0, os.SEEK_END)
+            if end % self.INDEX.size:
+                file.truncate(end - end % self.INDEX.size)
+            file.write(self.INDEX.pack(generation, start, offset - start))
+            file.flush()
+            os.fsync(file.fileno())
+
+    def refresh(self):
+        if not os.path.exists(self.index_path):
+            return
+
+        with open(self.index_path, "rb") as file:
+            file.seek(self.indexed * self.INDEX.size)
+            data = file.read()
+
+        for i in range(len(data) // self.INDEX.size):
+            generation, offset, length = self.INDEX.unpack_from(data, i * self.INDEX.size)
+            self.entries[generation] = (offset, length)
+            self.indexed += 1
+
+        # remap only when the archive has grown past what is already mapped
+        end = max((offset + length for offset, length in self.entries.values()), default=0)
+        if end and (self.map is None or len(self.map) < end):
+            self.close()
+            self.file = open(self.path, "rb")
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def generations(self) -> List[int]:
+        self.refresh()
+        return sorted(self.entries)
+
+    def record(self, generation):
+        if generation not in self.entries:
+            self.refresh()
+
+        offset, length = self.entries[generation]
+        return memoryview(self.map)[offset:offset + length], offset
+
+    def species(self, generation) -> List[Tuple[float, int, int, int]]:
+        data, start = self.record(generation)
+        magic, generation, species, genomes = self.RECORD.unpack_from(data)
+        return [self.SPECIES.unpack_from(data, self.RECORD.size + s * self.SPECIES.size) for s in range(species)]
+
+    def genomes(self, generation) -> int:
+        data, start = self.record(generation)
+        return self.RECORD.unpack_from(data)[3]
+
+    def genome(self, generation, k) -> Genotype:
+        data, start = self.record(generation)
+        magic, generation, species, genomes = self.RECORD.unpack_from(data)
+        if not 0 <= k < genomes:
+            raise IndexError(k)
+
+        entry = self.RECORD.size + self.SPECIES.size * species + self.GENOME.size * k
+        offset, vertices, edges, fitness = self.GENOME.unpack_from(data, entry)
+
+        columns, end = Checkpoint.columns(data, offset - start, vertices, edges)
+        genotype = Genotype.unpack(columns)
+        genotype.fitness = fitness
+        return genotype
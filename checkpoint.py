@@ -0,0 +1,425 @@
+import os
+import struct
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from neuro_evolution.genotype import Genotype, VertexInfo
+from neuro_evolution.mutation import Mutation
+from neuro_evolution.population import Population, Species
+
+
+class State:
+    def __init__(self):
+        self.generation = 0
+        self.champion_score = 0.0
+        self.markings = b''
+        self.species: List[Tuple[float, int, List[Genotype]]] = []
+
+
+class Checkpoint:
+    MAGIC = b'MNPC'
+    VERSION = 1
+
+    HEADER = struct.Struct('<4sHidII')  # magic, version, generation, champion score, markings, species
+    SPECIES = struct.Struct('<dII')  # top fitness, staleness, members
+    GENOME = struct.Struct('<II')  # vertices, edges
+
+    # gene columns in Genotype.pack order: typecode, and whether the column has one entry per vertex or per edge
+    COLUMNS = (('b', True), ('i', True), ('i', False), ('i', False), ('d', False), ('b', False), ('i', False))
+    MARKING = struct.calcsize('<iii')
+
+    @staticmethod
+    def save(target, tournament):
+        Checkpoint.write(target, Checkpoint.capture(tournament))
+
+    @staticmethod
+    def load(source, tournament):
+        with open(source, "rb") as file:
+            magic = file.read(len(Checkpoint.MAGIC))
+
+        if magic == Checkpoint.MAGIC:
+            state = Checkpoint.read(source)
+        elif magic == DeltaCheckpoint.MAGIC:
+            state = DeltaCheckpoint.read(source)
+        else:
+            state = Checkpoint.read_legacy(source)
+
+        Checkpoint.restore(state, tournament)
+
+    @staticmethod
+    def convert(legacy, target):
+        Checkpoint.write(target, Checkpoint.read_legacy(legacy))
+
+    @staticmethod
+    def capture(tournament):
+        state = State()
+        state.generation = Population.instance.GENERATION
+        state.champion_score = tournament.champion_score
+        state.markings = Mutation.instance.export_markings()
+        # clones are plain buffer copies, so the snapshot stays valid while the population moves on
+        state.species = [(s.topFitness, s.staleness, [genotype.clone() for genotype in s.members])
+                         for s in Population.instance.species]
+        return state
+
+    @staticmethod
+    def restore(state, tournament):
+        Population.instance.GENERATION = state.generation
+        tournament.champion_score = state.champion_score
+
+        Mutation.instance.historical.clear()
+        Mutation.instance.markings.clear()
+        Mutation.instance.import_markings(state.markings)
+
+        Population.instance.species.clear()
+        Population.instance.genetics.clear()
+
+        for top_fitness, staleness, members in state.species:
+            species = Species()
+            species.topFitness = top_fitness
+            species.staleness = staleness
+            species.members.extend(members)
+            Population.instance.species.append(species)
+            Population.instance.genetics.extend(members)
+
+        Population.instance.inscribe_population()
+
+    @staticmethod
+    def write(target, state, keep=1):
+        temporary = target + ".tmp"
+
+        with open(temporary, "wb") as file:
+            file.write(Checkpoint.HEADER.pack(Checkpoint.MAGIC, Checkpoint.VERSION, state.generation,
+                                              state.champion_score, len(state.markings) // Checkpoint.MARKING,
+                                              len(state.species)))
+            file.write(state.markings)
+
+            for top_fitness, staleness, members in state.species:
+                file.write(Checkpoint.SPECIES.pack(top_fitness, staleness, len(members)))
+
+                for genotype in members:
+                    file.write(Checkpoint.GENOME.pack(len(genotype.indices), len(genotype.innovations)))
+                    for column in genotype.pack():
+                        file.write(column)
+
+            file.flush()
+            os.fsync(file.fileno())
+
+        # the new file only takes the target's name once it is fully on disk
+        Checkpoint.rotate(target, keep)
+        os.replace(temporary, target)
+        Checkpoint.sync_directory(target)
+
+    @staticmethod
+    def sync_directory(path):
+        # a rename only survives a crash once the directory holding it is on disk; Windows cannot open directories
+        if os.name != 'posix':
+            return
+
+        descriptor = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+        try:
+            os.fsync(descriptor)
+        finally:
+            os.close(descriptor)
+
+    @staticmethod
+    def rotate(target, keep):
+        if keep <= 1 or not os.path.exists(target):
+            return
+
+        for i in range(keep - 2, 0, -1):
+            if os.path.exists(f"{target}.{i}"):
+                os.replace(f"{target}.{i}", f"{target}.{i + 1}")
+
+        os.replace(target, f"{target}.1")
+
+    @staticmethod
+    def latest(target, keep=1):
+        for path in [target] + [f"{target}.{i}" for i in range(1, keep)]:
+            if os.path.exists(path):
+                return path
+        return None
+
+    @staticmethod
+    def read(source):
+        with open(source, "rb") as file:
+            data = memoryview(file.read())
+
+        magic, version, generation, champion_score, markings, species = Checkpoint.HEADER.unpack_from(data)
+        if magic != Checkpoint.MAGIC or version != Checkpoint.VERSION:
+            raise ValueError(f"unsupported checkpoint {magic!r} version {version}")
+
+        state = State()
+        state.generation = generation
+        state.champion_score = champion_score
+
+        offset = Checkpoint.HEADER.size
+        state.markings = data[offset:offset + markings * Checkpoint.MARKING]
+        offset += markings * Checkpoint.MARKING
+
+        for _ in range(species):
+            top_fitness, staleness, count = Checkpoint.SPECIES.unpack_from(data, offset)
+            offset += Checkpoint.SPECIES.size
+
+            members = []
+            for _ in range(count):
+                vertices, edges = Checkpoint.GENOME.unpack_from(data, offset)
+                offset += Checkpoint.GENOME.size
+
+                columns, offset = Checkpoint.columns(data, offset, vertices, edges)
+                members.append(Genotype.unpack(columns))
+
+            state.species.append((top_fitness, staleness, members))
+
+        return state
+
+    @staticmethod
+    def columns(data, offset, vertices, edges):
+        # the columns are sliced straight out of the buffer and copied once into the gene arrays
+        columns = []
+        for typecode, by_vertex in Checkpoint.COLUMNS:
+            size = struct.calcsize(typecode) * (vertices if by_vertex else edges)
+            columns.append(data[offset:offset + size])
+            offset += size
+
+        return columns, offset
+
+    @staticmethod
+    def read_legacy(source):
+        # the text format written by earlier versions: generation;score;markings;species&members&...;
+        with open(source, "r") as file:
+            parts = file.read().split(';')
+
+        state = State()
+        state.generation = int(parts[0])
+        state.champion_score = float(parts[1])
+
+        markings = [int(value) for value in parts[2].split(',') if value]
+        markings = markings[:len(markings) - len(markings) % 3]
+        state.markings = struct.pack(f'<{len(markings)}i', *markings)
+
+        species_parts = parts[3].split('&')
+        for x in range(0, len(species_parts) - 1, 2):
+            top_fitness, staleness = species_parts[x].split(',')
+            members = []
+
+            for network in species_parts[x + 1].split('n'):
+                genotype = Genotype()
+                vertices, edges = network.split('#')
+
+                fields = vertices.split(',')
+                for j in range(0, len(fields) - 1, 2):
+                    genotype.add_vertex(getattr(VertexInfo.EType, fields[j + 1]), int(fields[j]))
+
+                fields = edges.split(',')
+                for j in range(0, len(fields) - 1, 5):
+                    genotype.add_edge(int(fields[j]), int(fields[j + 1]), float(fields[j + 2]),
+                                      fields[j + 3] == 'True', int(fields[j + 4]))
+
+                members.append(genotype)
+
+            state.species.append((float(top_fitness), int(staleness), members))
+
+        return state
+
+
+class CheckpointWriter:
+    def __init__(self, target, keep=3):
+        self.target = target
+        self.keep = keep
+        self.condition = threading.Condition()
+        self.pending = None
+        self.busy = False
+        self.closed = False
+        self.error = None
+        self.latencies: List[float] = []
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, tournament):
+        state = Checkpoint.capture(tournament)
+
+        with self.condition:
+            self.check()
+            # a snapshot still waiting to be written is superseded by the newer one
+            self.pending = state
+            self.condition.notify_all()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.pending is None and not self.closed:
+                    self.condition.wait()
+
+                if self.pending is None:
+                    return
+
+                state = self.pending
+                self.pending = None
+                self.busy = True
+
+            start = time.perf_counter()
+            try:
+                Checkpoint.write(self.target, state, self.keep)
+            except Exception as error:
+                with self.condition:
+                    self.error = error
+                    self.busy = False
+                    self.condition.notify_all()
+                continue
+
+            latency = time.perf_counter() - start
+
+            with self.condition:
+                self.latencies.append(latency)
+                self.busy = False
+                self.condition.notify_all()
+
+            print(f"CHECKPOINT {state.generation} written in {latency * 1000:.1f} ms")
+
+    def check(self):
+        if self.error is not None:
+            error = self.error
+            self.error = None
+            raise error
+
+    def flush(self):
+        with self.condition:
+            while self.pending is not None or self.busy:
+                self.condition.wait()
+            self.check()
+
+    def close(self):
+        self.flush()
+
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+        self.thread.join()
+
+
+class DeltaCheckpoint:
+    MAGIC = b'MNPD'
+    VERSION = 1
+
+    HEADER = struct.Struct('<4sH')  # magic, version
+    LENGTH = struct.Struct('<Q')  # bytes in the record that follows
+    RECORD = struct.Struct('<idIII')  # generation, champion score, new markings, genomes, species
+    ENTRY = struct.Struct('<qII')  # genome id, vertices, edges
+    MEMBERSHIP = struct.Struct('<dII')  # top fitness, staleness, members
+
+    def __init__(self, target, compact=10):
+        self.target = target
+        self.compact = compact
+        self.written: Dict[int, int] = {}
+        self.markings = 0
+        self.records = 0
+
+    def save(self, tournament):
+        # every compact-th save starts a fresh journal holding the whole population
+        full = self.records % self.compact == 0
+        species = Population.instance.species
+        record = self.record(tournament, {} if full else self.written, 0 if full else self.markings)
+
+        if full:
+            temporary = self.target + ".tmp"
+            with open(temporary, "wb") as file:
+                file.write(self.HEADER.pack(self.MAGIC, self.VERSION))
+                file.write(record)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temporary, self.target)
+            Checkpoint.sync_directory(self.target)
+        else:
+            try:
+                with open(self.target, "ab") as file:
+                    file.write(record)
+                    file.flush()
+                    os.fsync(file.fileno())
+            except BaseException:
+                # a partly appended record would hide every record after it, so the next save rewrites the journal
+                self.records = 0
+                raise
+
+        # what the journal holds only moves on once the record is on disk, so a failed save is written again in full
+        self.markings = len(Mutation.instance.historical)
+        self.written = {genotype.id: genotype.version for s in species for genotype in s.members}
+        self.records += 1
+        return len(record)
+
+    def record(self, tournament, written, known):
+        species = Population.instance.species
+        markings = Mutation.instance.export_markings(known)
+        changed = [genotype for s in species for genotype in s.members if written.get(genotype.id) != genotype.version]
+
+        parts = [self.RECORD.pack(Population.instance.GENERATION, tournament.champion_score,
+                                  len(markings) // Checkpoint.MARKING, len(changed), len(species)), markings]
+
+        for genotype in changed:
+            parts.append(self.ENTRY.pack(genotype.id, len(genotype.indices), len(genotype.innovations)))
+            parts.extend(genotype.pack())
+
+        for s in species:
+            parts.append(self.MEMBERSHIP.pack(s.topFitness, s.staleness, len(s.members)))
+            parts.append(struct.pack(f'<{len(s.members)}q', *(genotype.id for genotype in s.members)))
+
+        body = b''.join(parts)
+        return self.LENGTH.pack(len(body)) + body
+
+    @staticmethod
+    def read(source):
+        with open(source, "rb") as file:
+            data = memoryview(file.read())
+
+        magic, version = DeltaCheckpoint.HEADER.unpack_from(data)
+        if magic != DeltaCheckpoint.MAGIC or version != DeltaCheckpoint.VERSION:
+            raise ValueError(f"unsupported journal {magic!r} version {version}")
+
+        state = State()
+        markings = bytearray()
+        genomes: Dict[int, Genotype] = {}
+
+        offset = DeltaCheckpoint.HEADER.size
+        while offset + DeltaCheckpoint.LENGTH.size <= len(data):
+            length, = DeltaCheckpoint.LENGTH.unpack_from(data, offset)
+            offset += DeltaCheckpoint.LENGTH.size
+
+            # a record cut short by a crash is dropped; everything before it is intact
+            if offset + length > len(data):
+                break
+
+            generation, champion_score, new_markings, changed, species = \
+                DeltaCheckpoint.RECORD.unpack_from(data, offset)
+            offset += DeltaCheckpoint.RECORD.size
+
+            state.generation = generation
+            state.champion_score = champion_score
+
+            markings += data[offset:offset + new_markings * Checkpoint.MARKING]
+            offset += new_markings * Checkpoint.MARKING
+
+            for _ in range(changed):
+                identifier, vertices, edges = DeltaCheckpoint.ENTRY.unpack_from(data, offset)
+                columns, offset = Checkpoint.columns(data, offset + DeltaCheckpoint.ENTRY.size, vertices, edges)
+                genotype = Genotype.unpack(columns)
+                genotype.id = identifier
+                genomes[identifier] = genotype
+
+            state.species = []
+            for _ in range(species):
+                top_fitness, staleness, count = DeltaCheckpoint.MEMBERSHIP.unpack_from(data, offset)
+                offset += DeltaCheckpoint.MEMBERSHIP.size
+
+                identifiers = struct.unpack_from(f'<{count}q', data, offset)
+                offset += 8 * count
+
+                state.species.append((top_fitness, staleness, [genomes[i] for i in identifiers]))
+
+            # genomes that left the population never come back, so only current members are kept
+            genomes = {genotype.id: genotype for _, _, members in state.species for genotype in members}
+
+        state.markings = bytes(markings)
+        Genotype.created = max([Genotype.created] + [i + 1 for i in genomes])
+
+        return state
@@ -0,0 +1,109 @@
+from typing import Dict, List
+
+import numpy as np
+
+from monopoly.board import Board
+from monopoly.neural_player import NeuralPlayer
+from neuro_evolution.phenotype import Phenotype
+from neuro_evolution.population_evaluator import PopulationEvaluator
+
+
+class Request:
+    def __init__(self, board: int, player: NeuralPlayer, key=None):
+        self.board = board
+        self.player = player
+        self.X = player.adapter.pack
+        self.key = key
+
+
+class Lockstep:
+    def __init__(self, evaluator: PopulationEvaluator = None):
+        self.evaluator = evaluator
+        self.values: Dict[NeuralPlayer, np.ndarray] = {}
+        self.batches = 0
+        self.evaluated = 0
+
+    def run(self, boards: List[Board]) -> List[int]:
+        games = [board.play() for board in boards]
+        outcomes = [Board.EOutcome.ONGOING] * len(boards)
+        live = list(range(len(boards)))
+
+        # every seat keeps its own activations, as its network would playing the game alone
+        self.values = {}
+        for board in boards:
+            for player in board.players:
+                if self.evaluator is not None:
+                    self.values[player] = np.zeros(self.evaluator.size)
+                    continue
+                if player.network.compiled is None:
+                    player.network.compile()
+                self.values[player] = np.zeros(player.network.compiled.size)
+
+        while live:
+            # each live board is advanced to its next forward pass, so a round answers all of them in one batch
+            batch = []
+            for b in live:
+                try:
+                    batch.append(self.pending(b, games[b]))
+                except StopIteration as stop:
+                    outcomes[b] = stop.value
+
+            if batch:
+                self.evaluate(batch)
+            live = [request.board for request in batch]
+
+        return outcomes
+
+    @staticmethod
+    def pending(b, game) -> Request:
+        # outputs the cache already holds are supplied on the spot instead of waiting for the round
+        while True:
+            player = next(game)
+            cache = player.network.cache
+            if cache is None:
+                return Request(b, player)
+
+            key = cache.fingerprint(player.adapter.pack)
+            Y = cache.get(key)
+            if Y is None:
+                return Request(b, player, key)
+            player.supplied = Y
+
+    def evaluate(self, batch: List[Request]):
+        if self.evaluator is not None:
+            networks = [self.evaluator.genome(request.player.network) for request in batch]
+            values = np.array([self.values[request.player] for request in batch])
+            Y = self.evaluator.evaluate(networks, [request.X for request in batch], values)
+
+            for request, row, state in zip(batch, Y, values):
+                self.values[request.player] = state
+                self.supply(request, row)
+
+            self.batches += 1
+            self.evaluated += len(batch)
+            return
+
+        groups: Dict[Phenotype, List[Request]] = {}
+        for request in batch:
+            groups.setdefault(request.player.network, []).append(request)
+
+        for phenotype, requests in groups.items():
+            X = np.array([request.X for request in requests])
+            values = np.array([self.values[request.player] for request in requests])
+
+            Y = phenotype.propagate_batch(X, values).tolist()
+
+            for request, row, state in zip(requests, Y, values):
+                self.values[request.player] = state
+                self.supply(request, row)
+
+            self.batches += 1
+            self.evaluated += len(requests)
+
+    @staticmethod
+    def supply(request: Request, Y):
+        request.player.supplied = Y
+
+        cache = request.player.network.cache
+        if cache is not None:
+            cache.put(request.key, Y)
@@ -1,5 +1,6 @@
 from typing import List
 
+from monopoly.game_state import GameState
 from monopoly.neural_player import NeuralPlayer
 from monopoly.player import Player
 from rng import RNG
@@ -117,36 +118,51 @@ class Board:
             [31, 32, 34],
             [37, 39, -1]]
 
-    mortgaged = [False] * 40
-    owners = [-1] * 40
     property_ = [-1, 0, -1, 1, -1, -1, 2, -1, 2, 3, -1, 4, -1, 4, 5, -1, 6, -1, 6, 7,
                  -1, 8, -1, 8, 9, -1, 10, 10, -1, 11, -1, 12, 12, -1, 13, -1, -1, 14,
                  -1, 15]
-    houses = [0] * 40
-    original = [-1] * 40
-
-    mode = EMode.ROLL
-    players = []
-    adapter = None
-    random = None
-    turn = 0
-    count = 0
-    remaining = 0
-    last_roll = 0
-
-    chance = []
-    chest = []
-
-    def __init__(self, _adapter):
+
+    def __init__(self, _adapter, state=None):
         self.players = [NeuralPlayer() for _ in range(self.PLAYER_COUNT)]
         self.random = RNG()
+        # dice and cards come from one stream and trades from another,
+        # so trading decisions never shift the dice a seat sees
+        self.dice = None
+        self.gen = None
         self.adapter = _adapter
 
+        self.state = GameState() if state is None else state
+        self.mortgaged = self.state.mortgaged
+        self.owners = self.state.owners
+        self.houses = self.state.houses
+        self.original = self.state.original
+
+        self.mode = Board.EMode.ROLL
+        self.turn = 0
+        self.count = 0
+        self.remaining = 0
+        self.last_roll = 0
+
+        self.reset()
+
+    def reset(self, sequence=None):
+        self.dice, self.gen = RNG.streams(self.random.spawn() if sequence is None else sequence)
+
+        self.state.reset()
+        self.adapter.reset()
+
+        for player in self.players:
+            player.reset()
+
         for i in range(self.PLAYER_COUNT):
             self.adapter.set_position(i, self.players[i].position)
             self.adapter.set_money(i, self.players[i].funds)
 
+        self.mode = Board.EMode.ROLL
+        self.turn = 0
+        self.count = 0
         self.remaining = self.PLAYER_COUNT
+        self.last_roll = 0
 
         chance = [self.CardEntry(self.ECard.ADVANCE, 39),
                   self.CardEntry(self.ECard.ADVANCE, 0),
@@ -164,7 +180,7 @@ class Board:
                   self.CardEntry(self.ECard.ADVANCE, 5),
                   self.CardEntry(self.ECard.CHAIRMAN, 0),
                   self.CardEntry(self.ECard.REWARD, 150)]
-        self.chance = self.random.shuffle_card_entries(chance)
+        self.chance = self.random.shuffle_card_entries(chance, self.dice)
 
         chest = [self.CardEntry(self.ECard.ADVANCE, 0),
                  self.CardEntry(self.ECard.REWARD, 200),
@@ -182,18 +198,46 @@ class Board:
                  self.CardEntry(self.ECard.STREET, 0),
                  self.CardEntry(self.ECard.REWARD, 10),
                  self.CardEntry(self.ECard.REWARD, 100)]
-        self.chest = self.random.shuffle_card_entries(chest)
+        self.chest = self.random.shuffle_card_entries(chest, self.dice)
+
+    def forward_passes(self):
+        passes = 0
+        saved = 0
+        for player in self.players:
+            passes += player.passes
+            saved += player.saved
+        return passes, saved
 
     def step(self):
         if self.mode == Board.EMode.ROLL:
-            return self.roll()
+            return self.resolve(self.roll())
         return Board.EOutcome.ONGOING
 
+    def play(self):
+        # the whole game as one generator, so a driver can hold many boards at their next decision at once
+        outcome = Board.EOutcome.ONGOING
+        while outcome == Board.EOutcome.ONGOING and self.mode == Board.EMode.ROLL:
+            outcome = yield from self.roll()
+        return outcome
+
+    @staticmethod
+    def resolve(turn):
+        # played on its own, a board lets every yielded player run its own forward pass when it decides
+        try:
+            while True:
+                next(turn)
+        except StopIteration as stop:
+            return stop.value
+
+    def consult(self, player):
+        # a player whose outputs are stale is handed out first, so the driver can supply them before it decides
+        if player.signature != self.adapter.signature:
+            yield player
+
     def roll(self):
-        self.before_turn()
+        yield from self.before_turn()
 
-        d1 = self.random.gen.randint(1, 6)
-        d2 = self.random.gen.randint(1, 6)
+        d1, d2 = self.dice.roll()
 
         self.last_roll = d1 + d2
 
@@ -202,6 +246,7 @@ class Board:
 
         if self.players[self.turn].state == Player.EState.JAIL:
             self.adapter.set_turn(self.turn)
+            yield from self.consult(self.players[self.turn])
             decision = self.players[self.turn].decide_jail()
 
             if decision == Player.EJailDecision.ROLL:
@@ -216,14 +261,14 @@ class Board:
                     self.players[self.turn].jail += 1
 
                     if self.players[self.turn].jail >= 3:
-                        self.payment(self.turn, self.JAIL_PENALTY)
+                        yield from self.payment(self.turn, self.JAIL_PENALTY)
 
                         self.players[self.turn].jail = 0
                         self.players[self.turn].state = Player.EState.NORMAL
 
                         self.adapter.set_jail(self.turn, 0)
             elif decision == Player.EJailDecision.PAY:
-                self.payment(self.turn, self.JAIL_PENALTY)
+                yield from self.payment(self.turn, self.JAIL_PENALTY)
 
                 self.players[self.turn].jail = 0
                 self.players[self.turn].state = Player.EState.NORMAL
@@ -247,7 +292,7 @@ class Board:
                         self.players[self.turn].jail += 1
 
                         if self.players[self.turn].jail >= 3:
-                            self.payment(self.turn, self.JAIL_PENALTY)
+                            yield from self.payment(self.turn, self.JAIL_PENALTY)
 
                             self.players[self.turn].jail = 0
                             self.players[self.turn].state = Player.EState.NORMAL
@@ -258,7 +303,7 @@ class Board:
             not_final_double = (not is_double) or (self.players[self.turn].doub <= 1)
 
             if not_final_double:
-                self.movement(d1 + d2, is_double)
+                yield from self.movement(d1 + d2, is_double)
 
         # Start turn again (unless retired or the double was from jail)
         if self.players[self.turn].state != Player.EState.RETIRED and is_double and not double_in_jail:
@@ -321,17 +366,19 @@ class Board:
 
                 self.adapter.set_selection_state(index, 1)
 
+                yield from self.consult(self.players[self.turn])
                 decision = self.players[self.turn].decide_advance(index)
 
                 self.adapter.set_selection_state(index, 0)
 
                 if decision == Player.EDecision.YES:
-                    self.advance(index)
+                    yield from self.advance(index)
             else:
                 self.adapter.set_turn(self.turn)
 
                 self.adapter.set_selection_state(index, 1)
 
+                yield from self.consult(self.players[self.turn])
                 decision = self.players[self.turn].decide_mortgage(index)
 
                 self.adapter.set_selection_state(index, 0)
@@ -355,6 +402,7 @@ class Board:
 
             self.adapter.set_selection_state(self.SETS[sets[j]][0], 1)
 
+            yield from self.consult(self.players[self.turn])
             decision = self.players[self.turn].decide_sell_house(sets[j])
 
             self.adapter.set_selection_state(self.SETS[sets[j]][0], 0)
@@ -389,6 +437,7 @@ class Board:
 
             self.adapter.set_selection_state(self.SETS[sets[j]][0], 1)
 
+            yield from self.consult(self.players[self.turn])
             decision = self.players[self.turn].decide_build_house(sets[j])
 
             self.adapter.set_selection_state(self.SETS[sets[j]][0], 0)
@@ -397,9 +446,9 @@ class Board:
 
             if decision > 0:
                 self.build_houses(sets[j], decision)
-                self.payment(self.turn, decision * self.BUILD[self.property_[self.SETS[sets[j]][0]]])
+                yield from self.payment(self.turn, decision * self.BUILD[self.property_[self.SETS[sets[j]][0]]])
 
-        self.trading()
+        yield from self.trading()
 
     def trading(self):
         from analytics import Analytics
@@ -424,27 +473,27 @@ class Board:
         trade_money_max = 500
 
         for t in range(trade_attempts):
-            give = self.random.gen.randint(0, max(min(len(self.players[self.turn].items), trade_item_max), 1) - 1)
+            give = self.gen.randint(0, max(min(len(self.players[self.turn].items), trade_item_max), 1) - 1)
 
-            selected_player = self.random.gen.randrange(0, len(candidates))
+            selected_player = self.gen.randrange(0, len(candidates))
 
             other = candidates[selected_player]
             other_index = candidates_index[selected_player]
 
-            receive = self.random.gen.randint(0, max(min(len(other.items), trade_item_max), 1) - 1)
+            receive = self.gen.randint(0, max(min(len(other.items), trade_item_max), 1) - 1)
 
             if self.players[self.turn].funds < 0 or other.funds < 0:
                 continue
 
-            money_give = self.random.gen.randint(0, max(min(self.players[self.turn].funds, trade_money_max), 1) - 1)
-            money_receive = self.random.gen.randint(0, max(min(other.funds, trade_money_max), 1) - 1)
+            money_give = self.gen.randint(0, max(min(self.players[self.turn].funds, trade_money_max), 1) - 1)
+            money_receive = self.gen.randint(0, max(min(other.funds, trade_money_max), 1) - 1)
             money_balance = money_give - money_receive
 
             if give == 0 or receive == 0:
                 continue
 
-            gift = self.random.gen.sample(self.players[self.turn].items, give)  # !
-            returning = self.random.gen.sample(other.items, receive)
+            gift = self.gen.sample(self.players[self.turn].items, give)  # !
+            returning = self.gen.sample(other.items, receive)
 
             # set neurons for trade
             for item in gift:
@@ -455,12 +504,14 @@ class Board:
 
             self.adapter.set_money_context(money_balance)
 
+            yield from self.consult(self.players[self.turn])
             decision = self.players[self.turn].decide_offer_trade()
 
             if decision == Player.EDecision.NO:
                 self.adapter.clear_selection_state()
                 continue
 
+            yield from self.consult(other)
             decision2 = other.decide_accept_trade()
 
             if decision2 == Player.EDecision.NO:
@@ -498,6 +549,7 @@ class Board:
             self.adapter.set_turn(i)
             self.adapter.set_selection_state(index, 1)
 
+            yield from self.consult(self.players[i])
             bids[i] = self.players[i].decide_auction_bid(index)
 
             self.adapter.set_selection_state(index, 0)
@@ -521,10 +573,10 @@ class Board:
                 backup.append(i)
 
         if candidates:
-            winner = candidates[self.random.gen.randint(0, len(candidates) - 1)]
-            self.payment(winner, max_)
+            winner = candidates[self.gen.randint(0, len(candidates) - 1)]
+            yield from self.payment(winner, max_)
         else:
-            winner = backup[self.random.gen.randint(0, len(backup) - 1)]
+            winner = backup[self.gen.randint(0, len(backup) - 1)]
 
         self.owners[index] = winner
         self.players[winner].items.append(index)
@@ -545,7 +597,7 @@ class Board:
         self.adapter.set_money(self.turn, self.players[self.turn].funds)
         self.adapter.set_position(self.turn, self.players[self.turn].position)
 
-        self.activate_tile()
+        yield from self.activate_tile()
 
     def activate_tile(self):
         index = self.players[self.turn].position
@@ -557,37 +609,40 @@ class Board:
             if owner == self.BANK_INDEX:
                 self.adapter.set_turn(self.turn)
                 self.adapter.set_selection(index)
+                yield from self.consult(self.players[self.turn])
                 decision = self.players[self.turn].decide_buy(index)
 
                 if decision == Player.EBuyDecision.BUY:
                     if self.players[self.turn].funds < self.COSTS[index]:
-                        self.auction(index)
+                        yield from self.auction(index)
                     else:
-                        self.payment(self.turn, self.COSTS[index])
+                        yield from self.payment(self.turn, self.COSTS[index])
                         self.owners[index] = self.turn
                         if self.original[index] == -1:
                             self.original[index] = self.turn
                         self.players[self.turn].items.append(index)
                         self.adapter.set_owner(index, owner)
                 elif decision == Player.EBuyDecision.AUCTION:
-                    self.auction(index)
+                    yield from self.auction(index)
             elif owner == self.turn:
                 pass
             elif not self.mortgaged[index]:
-                self.payment_to_player(self.turn, owner, self.PROPERTY_PENALTIES[self.property_[index]][self.houses[index]])
+                fine = self.PROPERTY_PENALTIES[self.property_[index]][self.houses[index]]
+                yield from self.payment_to_player(self.turn, owner, fine)
         elif tile == self.ETile.TRAIN:
             owner = self.owner(index)
 
             if owner == self.BANK_INDEX:
                 self.adapter.set_turn(self.turn)
                 self.adapter.set_selection(index)
+                yield from self.consult(self.players[self.turn])
                 decision = self.players[self.turn].decide_buy(index)
 
                 if decision == Player.EBuyDecision.BUY:
                     if self.players[self.turn].funds < self.COSTS[index]:
-                        self.auction(index)
+                        yield from self.auction(index)
                     else:
-                        self.payment(self.turn, self.COSTS[index])
+                        yield from self.payment(self.turn, self.COSTS[index])
                         self.owners[index] = self.turn
                         if self.original[index] == -1:
                             self.original[index] = self.turn
@@ -596,26 +651,27 @@ class Board:
                 elif owner == self.turn:
                     pass
                 elif decision == Player.EBuyDecision.AUCTION:
-                    self.auction(index)
+                    yield from self.auction(index)
             elif not self.mortgaged[index]:
                 trains = self.count_trains(owner)
                 if 1 <= trains <= 4:
                     fine = self.TRAIN_PENALTIES[trains - 1]
-                    self.payment_to_player(self.turn, owner, fine)
+                    yield from self.payment_to_player(self.turn, owner, fine)
         elif tile == self.ETile.UTILITY:
             owner = self.owner(index)
 
             if owner == self.BANK_INDEX:
                 self.adapter.set_turn(self.turn)
                 self.adapter.set_selection_state(index, 1)
+                yield from self.consult(self.players[self.turn])
                 decision = self.players[self.turn].decide_buy(index)
                 self.adapter.set_selection_state(index, 0)
 
                 if decision == Player.EBuyDecision.BUY:
                     if self.players[self.turn].funds < self.COSTS[index]:
-                        self.auction(index)
+                        yield from self.auction(index)
                     else:
-                        self.payment(self.turn, self.COSTS[index])
+                        yield from self.payment(self.turn, self.COSTS[index])
                         self.owners[index] = self.turn
                         if self.original[index] == -1:
                             self.original[index] = self.turn
@@ -624,18 +680,18 @@ class Board:
                 elif self.owner == self.turn:
                     pass
                 elif decision == Player.EBuyDecision.AUCTION:
-                    self.auction(index)
+                    yield from self.auction(index)
             elif owner != self.turn and not self.mortgaged[index]:
                 utilities = self.count_utilities(owner)
                 if 1 <= utilities <= 2:
                     fine = self.UTILITY_PENALTIES[utilities - 1] * self.last_roll
-                    self.payment_to_player(self.turn, owner, fine)
+                    yield from self.payment_to_player(self.turn, owner, fine)
         elif tile == self.ETile.TAX:
-            self.payment(self.turn, self.COSTS[index])
+            yield from self.payment(self.turn, self.COSTS[index])
         elif tile == self.ETile.CHANCE:
-            self.draw_chance()
+            yield from self.draw_chance()
         elif tile == self.ETile.CHEST:
-            self.draw_chest()
+            yield from self.draw_chest()
         elif tile == self.ETile.JAIL:
             self.players[self.turn].position = self.JAIL_INDEX
             self.players[self.turn].doub = 0
@@ -663,6 +719,7 @@ class Board:
                 self.adapter.set_turn(self.turn)
                 self.adapter.set_selection_state(self.SETS[sets[j]][0], 1)
 
+                yield from self.consult(self.players[self.turn])
                 decision = self.players[self.turn].decide_sell_house(sets[j])
 
                 self.adapter.set_selection_state(self.SETS[sets[j]][0], 0)
@@ -683,6 +740,7 @@ class Board:
                 self.adapter.set_turn(owner)
                 self.adapter.set_selection_state(self.players[owner].items[i], 1)
 
+                yield from self.consult(self.players[owner])
                 decision = self.players[owner].decide_mortgage(self.players[owner].items[i])
 
                 self.adapter.set_selection_state(self.players[owner].items[i], 0)
@@ -736,6 +794,7 @@ class Board:
                 self.adapter.set_turn(self.turn)
                 self.adapter.set_selection_state(self.SETS[sets[j]][0], 1)
 
+                yield from self.consult(self.players[self.turn])
                 decision = self.players[self.turn].decide_sell_house(sets[j])
 
                 self.adapter.set_selection_state(self.SETS[sets[j]][0], 0)
@@ -755,6 +814,7 @@ class Board:
                 self.adapter.set_turn(owner)
                 self.adapter.set_selection_state(self.players[owner].items[i], 0)
 
+                yield from self.consult(self.players[owner])
                 decision = self.players[owner].decide_mortgage(self.players[owner].items[i])
                 self.adapter.set_selection_state(self.players[owner].items[i], 1)
 
@@ -799,7 +859,7 @@ class Board:
         self.adapter.set_mortgage(index, 0)
 
         cost = int(self.COSTS[index] * self.MORTGAGE_INTEREST)
-        self.payment(self.owners[index], cost)
+        yield from self.payment(self.owners[index], cost)
 
     def count_trains(self, player):
         count = 0
@@ -832,17 +892,17 @@ class Board:
             self.players[self.turn].position = card.val
             self.adapter.set_position(self.turn, self.players[self.turn].position)
 
-            self.activate_tile()
+            yield from self.activate_tile()
         elif card.card == self.ECard.REWARD:
             self.players[self.turn].funds += card.val
             self.adapter.set_money(self.turn, self.players[self.turn].funds)
         elif card.card == self.ECard.FINE:
-            self.payment(self.turn, card.val)
+            yield from self.payment(self.turn, card.val)
         elif card.card == self.ECard.BACK3:
             self.players[self.turn].position -= 3
             self.adapter.set_position(self.turn, self.players[self.turn].position)
 
-            self.activate_tile()
+            yield from self.activate_tile()
         elif card.card == self.ECard.CARD:
             self.players[self.turn].card += 1
             self.adapter.set_card(self.turn, self.players[self.turn].card)
@@ -854,16 +914,16 @@ class Board:
             self.adapter.set_position(self.turn, self.players[self.turn].position)
             self.adapter.set_jail(self.turn, 1)
         elif card.card == self.ECard.RAILROAD2:
-            self.advance_to_train2()
+            yield from self.advance_to_train2()
         elif card.card == self.ECard.UTILITY10:
-            self.advance_to_utility10()
+            yield from self.advance_to_utility10()
         elif card.card == self.ECard.CHAIRMAN:
             for i in range(self.PLAYER_COUNT):
                 if i == self.turn:
                     continue
 
                 if self.players[i].state != Player.EState.RETIRED:
-                    self.payment_to_player(self.turn, i, 50)
+                    yield from self.payment_to_player(self.turn, i, 50)
         elif card.card == self.ECard.REPAIRS:
             house_count = 0
             hotel_count = 0
@@ -876,7 +936,7 @@ class Board:
                 else:
                     hotel_count += 1
 
-            self.payment(self.turn, house_count * 25 + hotel_count * 100)
+            yield from self.payment(self.turn, house_count * 25 + hotel_count * 100)
 
     def draw_chest(self):
         card = self.chest[0]
@@ -891,12 +951,12 @@ class Board:
             self.players[self.turn].position = card.val
             self.adapter.set_position(self.turn, self.players[self.turn].position)
 
-            self.activate_tile()
+            yield from self.activate_tile()
         elif card.card == self.ECard.REWARD:
             self.players[self.turn].funds += card.val
             self.adapter.set_money(self.turn, self.players[self.turn].funds)
         elif card.card == self.ECard.FINE:
-            self.payment(self.turn, card.val)
+            yield from self.payment(self.turn, card.val)
         elif card.card == self.ECard.CARD:
             self.players[self.turn].card += 1
             self.adapter.set_card(self.turn, self.players[self.turn].card)
@@ -913,7 +973,7 @@ class Board:
                     continue
 
                 if self.players[i].state != Player.EState.RETIRED:
-                    self.payment_to_player(i, self.turn, 10)
+                    yield from self.payment_to_player(i, self.turn, 10)
         elif card.card == self.ECard.STREET:
             house_count = 0
             hotel_count = 0
@@ -926,7 +986,7 @@ class Board:
                 else:
                     hotel_count += 1
 
-            self.payment(self.turn, house_count * 40 + hotel_count * 115)
+            yield from self.payment(self.turn, house_count * 40 + hotel_count * 115)
 
     def advance_to_train2(self):
         index = self.players[self.turn].position
@@ -952,14 +1012,15 @@ class Board:
         if owner == self.BANK_INDEX:
             self.adapter.set_turn(self.turn)
             self.adapter.set_selection_state(index, 0)
+            yield from self.consult(self.players[self.turn])
             decision = self.players[self.turn].decide_buy(index)
             self.adapter.set_selection_state(index, 1)
 
             if decision == Player.EBuyDecision.BUY:
                 if self.players[self.turn].funds < self.COSTS[index]:
-                    self.auction(index)
+                    yield from self.auction(index)
                 else:
-                    self.payment(self.turn, self.COSTS[index])
+                    yield from self.payment(self.turn, self.COSTS[index])
                     self.owners[index] = self.turn
 
                     if self.original[index] == -1:
@@ -968,7 +1029,7 @@ class Board:
                     self.players[self.turn].items.append(index)
                     self.adapter.set_owner(index, self.turn)
             elif decision == Player.EBuyDecision.AUCTION:
-                self.auction(index)
+                yield from self.auction(index)
         elif owner == self.turn:
             pass
         elif not self.mortgaged[index]:
@@ -976,7 +1037,7 @@ class Board:
 
             if 1 <= trains <= 4:
                 fine = self.TRAIN_PENALTIES[trains - 1]
-                self.payment_to_player(self.turn, owner, fine * 2)
+                yield from self.payment_to_player(self.turn, owner, fine * 2)
 
     def advance_to_utility10(self):
         index = self.players[self.turn].position
@@ -997,13 +1058,14 @@ class Board:
 
         if owner == self.BANK_INDEX:
             self.adapter.set_turn(self.turn)
+            yield from self.consult(self.players[self.turn])
             decision = self.players[self.turn].decide_buy(index)
 
             if decision == Player.EBuyDecision.BUY:
                 if self.players[self.turn].funds < self.COSTS[index]:
-                    self.auction(index)
+                    yield from self.auction(index)
                 else:
-                    self.payment(self.turn, self.COSTS[index])
+                    yield from self.payment(self.turn, self.COSTS[index])
                     self.owners[index] = self.turn
 
                     if self.original[index] == -1:
@@ -1012,12 +1074,12 @@ class Board:
                     self.players[self.turn].items.append(index)
                     self.adapter.set_owner(index, self.turn)
             if decision == Player.EBuyDecision.AUCTION:
-                self.auction(index)
+                yield from self.auction(index)
         elif owner == self.turn:
             pass
         elif not self.mortgaged[index]:
             fine = 10 * self.last_roll
-            self.payment_to_player(self.turn, owner, fine)
+            yield from self.payment_to_player(self.turn, owner, fine)
 
     def find_sets(self, owner):
         sets = []
@@ -0,0 +1,21 @@
+from array import array
+
+
+class GameState:
+    LENGTH = 40
+
+    UNOWNED = array('b', [-1]) * LENGTH
+    EMPTY = array('b', [0]) * LENGTH
+
+    def __init__(self):
+        self.owners = array('b', self.UNOWNED)
+        self.original = array('b', self.UNOWNED)
+        self.houses = array('b', self.EMPTY)
+        self.mortgaged = array('b', self.EMPTY)
+
+    def reset(self):
+        # slice assignment copies into the existing buffers, so aliases held by the board stay valid
+        self.owners[:] = self.UNOWNED
+        self.original[:] = self.UNOWNED
+        self.houses[:] = self.EMPTY
+        self.mortgaged[:] = self.EMPTY
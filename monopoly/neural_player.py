@@ -2,19 +2,42 @@ from monopoly.player import Player
 
 
 class NeuralPlayer(Player):
+    __slots__ = ('network', 'adapter', 'outputs', 'signature', 'supplied', 'passes', 'saved')
+
     def __init__(self):
-        super().__init__()
         self.network = None
         self.adapter = None
+        super().__init__()
+
+    def reset(self):
+        super().reset()
+        self.outputs = None
+        self.signature = None
+        self.supplied = None
+        self.passes = 0
+        self.saved = 0
+
+    def decision(self):
+        # one forward pass per decision point; reused until the board changes the adapter contents
+        if self.signature != self.adapter.signature:
+            if self.supplied is None:
+                self.supplied = self.network.propagate(self.adapter.pack)
+            self.outputs = self.supplied
+            self.supplied = None
+            self.signature = self.adapter.signature
+            self.passes += 1
+        else:
+            self.saved += 1
+        return self.outputs
 
     def decide_buy(self, index):
-        y = self.network.propagate(self.adapter.pack)
+        y = self.decision()
         if y[0] > 0.5:
             return self.EBuyDecision.BUY
         return self.EBuyDecision.AUCTION
 
     def decide_jail(self):
-        y = self.network.propagate(self.adapter.pack)
+        y = self.decision()
         if y[1] < 0.333:
             return self.EJailDecision.CARD
         elif y[1] < 0.666:
@@ -22,20 +45,20 @@ class NeuralPlayer(Player):
         return self.EJailDecision.PAY
 
     def decide_mortgage(self, index):
-        y = self.network.propagate(self.adapter.pack)
+        y = self.decision()
         if y[2] > 0.5:
             return self.EDecision.YES
         return self.EDecision.NO
 
     def decide_advance(self, index):
-        y = self.network.propagate(self.adapter.pack)
+        y = self.decision()
         if y[3] > 0.5:
             return self.EDecision.YES
         return self.EDecision.NO
 
     def decide_auction_bid(self, index):
         from analytics import Analytics
-        y = self.network.propagate(self.adapter.pack)
+        y = self.decision()
         result = y[4]
         money = self.adapter.convert_money_value(result)
 
@@ -44,27 +67,27 @@ class NeuralPlayer(Player):
         return int(money)
 
     def decide_build_house(self, set_):
-        y = self.network.propagate(self.adapter.pack)
+        y = self.decision()
         result = y[5]
         money = self.adapter.convert_house_value(result)
 
         return int(money)
 
     def decide_sell_house(self, set_):
-        y = self.network.propagate(self.adapter.pack)
+        y = self.decision()
         result = y[6]
         money = self.adapter.convert_house_value(result)
 
         return int(money)
 
     def decide_offer_trade(self):
-        y = self.network.propagate(self.adapter.pack)
+        y = self.decision()
         if y[7] > 0.5:
             return self.EDecision.YES
         return self.EDecision.NO
 
     def decide_accept_trade(self):
-        y = self.network.propagate(self.adapter.pack)
+        y = self.decision()
         if y[8] > 0.5:
             return self.EDecision.YES
         return self.EDecision.NO
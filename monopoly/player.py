@@ -21,14 +21,20 @@ class Player:
         YES = 1
         NO = 2
 
+    __slots__ = ('state', 'position', 'funds', 'jail', 'doub', 'card', 'items')
+
     def __init__(self):
+        self.items: List[int] = []
+        self.reset()
+
+    def reset(self):
         self.state = Player.EState.NORMAL
         self.position = 0
         self.funds = 1500
         self.jail = 0
         self.doub = 0
         self.card = 0
-        self.items: List[int] = []
+        self.items.clear()
 
     def decide_buy(self, index):
         return Player.EBuyDecision.BUY
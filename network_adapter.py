@@ -1,6 +1,13 @@
+from functools import reduce
+from operator import xor
+
+
 class NetworkAdapter:
+    EMPTY_SIGNATURE = reduce(xor, (hash((i, 0.0)) for i in range(127)))
+
     def __init__(self):
         self.pack = [0.0] * 127
+        self.signature = self.EMPTY_SIGNATURE
 
         self.turn = 0
         self.pos = 4
@@ -22,6 +29,14 @@ class NetworkAdapter:
 
     def reset(self):
         self.pack = [0.0] * 127
+        self.signature = self.EMPTY_SIGNATURE
+
+    def write(self, index, value):
+        # the signature tracks the pack contents, so undoing a write restores the previous signature
+        old = self.pack[index]
+        if old != value:
+            self.signature ^= hash((index, old)) ^ hash((index, value))
+            self.pack[index] = value
 
     @staticmethod
     def convert_money(money):
@@ -57,42 +72,42 @@ class NetworkAdapter:
 
     def set_turn(self, index):
         for i in range(4):
-            self.pack[i] = 0.0
-        self.pack[index] = 1.0
+            self.write(i, 0.0)
+        self.write(index, 1.0)
 
     def set_selection(self, index):
         for i in range(self.select, self.select + 29):
-            self.pack[i] = 0.0
-        self.pack[self.select + self.PROPS[index]] = 1.0
+            self.write(i, 0.0)
+        self.write(self.select + self.PROPS[index], 1.0)
 
     def set_selection_state(self, index, state):
-        self.pack[self.select + self.PROPS[index]] = state
+        self.write(self.select + self.PROPS[index], state)
 
     def set_money_context(self, state):
-        self.pack[self.select_money] = state
+        self.write(self.select_money, state)
 
     def clear_selection_state(self):
         for i in range(self.select, self.select + 29):
-            self.pack[i] = 0.0
+            self.write(i, 0.0)
 
     def set_position(self, index, position):
-        self.pack[self.pos + index] = self.convert_position(position)
+        self.write(self.pos + index, self.convert_position(position))
 
     def set_money(self, index, money):
-        self.pack[self.mon + index] = self.convert_money(money)
+        self.write(self.mon + index, self.convert_money(money))
 
     def set_card(self, index, cards):
-        self.pack[self.card + index] = self.convert_card(cards)
+        self.write(self.card + index, self.convert_card(cards))
 
     def set_jail(self, index, state):
-        self.pack[self.jail + index] = state
+        self.write(self.jail + index, state)
 
     def set_owner(self, property_, state):
         convert = (state + 1) / 4.0
-        self.pack[self.own + self.PROPS[property_]] = convert
+        self.write(self.own + self.PROPS[property_], convert)
 
     def set_mortgage(self, property_, state):
-        self.pack[self.mort + self.PROPS[property_]] = state
+        self.write(self.mort + self.PROPS[property_], state)
 
     def set_house(self, property_, houses):
-        self.pack[self.house + self.HOUSES[property_]] = self.convert_house(houses)
+        self.write(self.house + self.HOUSES[property_], self.convert_house(houses))
@@ -0,0 +1,188 @@
+import numpy as np
+
+from neuro_evolution.phenotype import Edge, Phenotype
+
+
+def sigmoid(x):
+    # clamped so very negative sums underflow to 0.0 instead of overflowing exp
+    np.negative(x, out=x)
+    np.minimum(x, 709.0, out=x)
+    np.exp(x, out=x)
+    x += 1.0
+    return np.reciprocal(x, out=x)
+
+
+def row_sum(block, contrib):
+    # reduceat cannot express empty rows, so they are summed over the filled rows only and scattered back
+    members, indptr, starts, filled = block
+    if not len(starts):
+        return np.zeros(contrib.shape[:-1] + (len(members),))
+
+    total = np.add.reduceat(contrib, starts, axis=-1)
+    if filled is None:
+        return total
+
+    scattered = np.zeros(contrib.shape[:-1] + (len(members),))
+    scattered[..., filled] = total
+    return scattered
+
+
+def csr(rows, edges):
+    # edges are (source, destination, weight, position) with destinations given as row positions; returns
+    # the row pointer plus column and weight arrays with every row's incoming edges contiguous
+    edges = sorted(edges, key=lambda e: e[1])
+    counts = np.bincount(np.array([e[1] for e in edges], dtype=np.intp), minlength=rows)
+    indptr = np.zeros(rows + 1, dtype=np.intp)
+    np.cumsum(counts, out=indptr[1:])
+
+    filled = np.flatnonzero(counts)
+    starts = indptr[:-1][filled]
+    if len(filled) == rows:
+        filled = None
+
+    source = np.array([e[0] for e in edges], dtype=np.intp)
+    weight = np.array([e[2] for e in edges], dtype=np.float64)
+    return indptr, starts, filled, source, weight, [e[3] for e in edges]
+
+
+class CompiledPhenotype:
+    def __init__(self, phenotype):
+        slots = phenotype.slots
+        size = len(phenotype.vertices)
+
+        inputs = [slots[vertex.index] for vertex in phenotype.vertices_inputs]
+        outputs = [slots[vertex.index] for vertex in phenotype.vertices_outputs]
+
+        forward = []
+        recurrent = []
+        disabled = []
+
+        for position, edge in enumerate(phenotype.edges):
+            entry = (slots[edge.source], slots[edge.destination], edge.weight, position)
+            if not edge.enabled:
+                disabled.append(entry)
+            elif edge.type == Edge.EType.RECURRENT:
+                recurrent.append(entry)
+            else:
+                forward.append(entry)
+
+        incoming = [[] for _ in range(size)]
+        for source, destination, weight, position in forward:
+            incoming[destination].append(source)
+
+        # vertices on the same level only depend on earlier levels, so each level is one array step
+        level = [0] * size
+        for vertex in phenotype.order:
+            slot = slots[vertex.index]
+            level[slot] = 1 + max((level[source] for source in incoming[slot]), default=0)
+
+        self.size = size
+        self.recurrent = bool(recurrent)
+        self.inputs = np.array(inputs, dtype=np.intp)
+        self.reported = np.array([slot for slot in outputs if phenotype.vertices[slot].incoming], dtype=np.intp)
+        self.padding = [0.0] * len(outputs)
+        self.values = np.zeros(size)
+
+        # only enabled edges are evaluated; disabled ones are kept aside so they cost nothing per pass
+        self.disabled_source = np.array([e[0] for e in disabled], dtype=np.intp)
+        self.disabled_destination = np.array([e[1] for e in disabled], dtype=np.intp)
+        self.disabled_weight = np.array([e[2] for e in disabled], dtype=np.float64)
+        self.locations = {e[3]: (self.disabled_weight, i) for i, e in enumerate(disabled)}
+
+        targets = sorted({e[1] for e in recurrent})
+        local = {slot: i for i, slot in enumerate(targets)}
+        edges = [(e[0], local[e[1]], e[2], e[3]) for e in recurrent]
+        indptr, starts, filled, self.recurrent_source, self.recurrent_weight, positions = csr(len(targets), edges)
+        self.feedback = (np.array(targets, dtype=np.intp), indptr, starts, filled)
+        self.locations.update((position, (self.recurrent_weight, i)) for i, position in enumerate(positions))
+
+        # incoming edges in CSR order, rows grouped by level so every level reads one contiguous slice
+        blocks = []
+        source = []
+        weight = []
+        positions = []
+        for depth in range(1, max(level, default=0) + 1):
+            members = [slot for slot in range(size) if level[slot] == depth]
+            local = {slot: i for i, slot in enumerate(members)}
+            edges = [(e[0], local[e[1]], e[2], e[3]) for e in forward if e[1] in local]
+            indptr, starts, filled, columns, values, order = csr(len(members), edges)
+            blocks.append((np.array(members, dtype=np.intp), indptr, starts, filled))
+            source.append(columns)
+            weight.append(values)
+            positions.extend(order)
+
+        self.source = np.concatenate(source) if source else np.zeros(0, dtype=np.intp)
+        self.weight = np.concatenate(weight) if weight else np.zeros(0)
+        self.locations.update((position, (self.weight, i)) for i, position in enumerate(positions))
+
+        self.levels = []
+        offset = 0
+        for block, columns in zip(blocks, source):
+            edges = slice(offset, offset + len(columns))
+            self.levels.append((block, self.source[edges], self.weight[edges]))
+            offset += len(columns)
+
+    def reset(self):
+        self.values.fill(0.0)
+
+    def patch(self, position, weight):
+        # the level arrays are views into self.weight, so one write updates the evaluated program
+        array, i = self.locations[position]
+        array[i] = weight
+
+    def step(self, values):
+        if self.recurrent:
+            feedback = np.zeros(self.size)
+            feedback[self.feedback[0]] = row_sum(self.feedback, values[self.recurrent_source] * self.recurrent_weight)
+
+        for block, source, weight in self.levels:
+            total = row_sum(block, values[source] * weight)
+            if self.recurrent:
+                total += feedback[block[0]]
+            values[block[0]] = sigmoid(total)
+
+    def step_batch(self, values):
+        if self.recurrent:
+            feedback = np.zeros(values.shape)
+            feedback[:, self.feedback[0]] = row_sum(self.feedback,
+                                                    values[:, self.recurrent_source] * self.recurrent_weight)
+
+        for block, source, weight in self.levels:
+            total = row_sum(block, values[:, source] * weight)
+            if self.recurrent:
+                total += feedback[:, block[0]]
+            values[:, block[0]] = sigmoid(total)
+
+    def propagate(self, X):
+        values = self.values
+        values[self.inputs] = X[:len(self.inputs)]
+
+        # acyclic genomes settle in one pass; cyclic ones iterate until the activations stop moving
+        for _ in range(Phenotype.REPEATS):
+            if not self.recurrent:
+                self.step(values)
+                break
+
+            previous = values.copy()
+            self.step(values)
+            if np.max(np.abs(values - previous)) < Phenotype.TOLERANCE:
+                break
+
+        return self.padding + values[self.reported].tolist()
+
+    def propagate_batch(self, X, values):
+        values[:, self.inputs] = np.asarray(X, dtype=np.float64)[:, :len(self.inputs)]
+
+        for _ in range(Phenotype.REPEATS):
+            if not self.recurrent:
+                self.step_batch(values)
+                break
+
+            previous = values.copy()
+            self.step_batch(values)
+            if np.max(np.abs(values - previous)) < Phenotype.TOLERANCE:
+                break
+
+        Y = np.zeros((len(X), len(self.padding) + len(self.reported)))
+        Y[:, len(self.padding):] = values[:, self.reported]
+        return Y
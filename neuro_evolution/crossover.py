@@ -1,4 +1,7 @@
 import random
+
+import numpy as np
+
 from neuro_evolution.genotype import Genotype, VertexInfo
 
 
@@ -11,15 +14,21 @@ class Crossover:
     C2 = 1.0
     C3 = 0.4
     DISTANCE = 1.0
+    OCCURRENCES = 1 << 16  # most edges one genome may give the same innovation
 
     def __new__(cls):
         if cls.instance is None:
             cls.instance = super().__new__(cls)
         return cls.instance
 
-    def produce_offspring(self, first, second):
-        copy_first = first.edges.copy()
-        copy_second = second.edges.copy()
+    @staticmethod
+    def align(first, second):
+        # merge-join over innovation order, returning edge positions; sorted() is linear when the edges are
+        # already sorted
+        innovations_first = first.innovations
+        innovations_second = second.innovations
+        edges_first = sorted(range(len(innovations_first)), key=innovations_first.__getitem__)
+        edges_second = sorted(range(len(innovations_second)), key=innovations_second.__getitem__)
 
         match_first = []
         match_second = []
@@ -28,41 +37,38 @@ class Crossover:
         excess_first = []
         excess_second = []
 
-        genes_first = len(first.edges)
-        genes_second = len(second.edges)
-
-        invmax_first = first.edges[-1].innovation
-        invmax_second = second.edges[-1].innovation
-
-        invmin = min(invmax_first, invmax_second)
-
-        for i in range(genes_first):
-            for j in range(genes_second):
-                info_first = copy_first[i]
-                info_second = copy_second[j]
+        i = 0
+        j = 0
+        while i < len(edges_first) and j < len(edges_second):
+            info_first = innovations_first[edges_first[i]]
+            info_second = innovations_second[edges_second[j]]
+
+            if info_first == info_second:
+                match_first.append(edges_first[i])
+                match_second.append(edges_second[j])
+                i += 1
+                j += 1
+            elif info_first < info_second:
+                disjoint_first.append(edges_first[i])
+                i += 1
+            else:
+                disjoint_second.append(edges_second[j])
+                j += 1
 
-                if info_first.innovation == info_second.innovation:
-                    match_first.append(info_first)
-                    match_second.append(info_second)
+        # whatever is left lies past the other parent's last innovation
+        excess_first.extend(edges_first[i:])
+        excess_second.extend(edges_second[j:])
 
-                    copy_first.remove(info_first)
-                    copy_second.remove(info_second)
+        return match_first, match_second, disjoint_first, disjoint_second, excess_first, excess_second
 
-                    genes_first -= 1
-                    genes_second -= 1
-                    break
+    @staticmethod
+    def inherit(child, parent, position):
+        child.add_edge(parent.sources[position], parent.destinations[position], parent.weights[position],
+                       parent.enabled[position], parent.innovations[position])
 
-        for info in copy_first:
-            if info.innovation > invmin:
-                excess_first.append(info)
-            else:
-                disjoint_first.append(info)
-
-        for info in copy_second:
-            if info.innovation > invmin:
-                excess_second.append(info)
-            else:
-                disjoint_second.append(info)
+    def produce_offspring(self, first, second):
+        match_first, match_second, disjoint_first, disjoint_second, excess_first, excess_second = \
+            self.align(first, second)
 
         child = Genotype()
 
@@ -70,28 +76,26 @@ class Crossover:
 
         for i in range(matching):
             roll = random.randint(0, 1)
-            if roll == 0 or not match_second[i].enabled:
-                child.add_edge(match_first[i].source, match_first[i].destination, match_first[i].weight,
-                               match_first[i].enabled, match_first[i].innovation)
+            if roll == 0 or not second.enabled[match_second[i]]:
+                self.inherit(child, first, match_first[i])
             else:
-                child.add_edge(match_second[i].source, match_second[i].destination, match_second[i].weight,
-                               match_second[i].enabled, match_second[i].innovation)
+                self.inherit(child, second, match_second[i])
 
-        for info in disjoint_first:
-            child.add_edge(info.source, info.destination, info.weight, info.enabled, info.innovation)
+        for position in disjoint_first:
+            self.inherit(child, first, position)
 
-        for info in excess_first:
-            child.add_edge(info.source, info.destination, info.weight, info.enabled, info.innovation)
+        for position in excess_first:
+            self.inherit(child, first, position)
 
         child.sort_edges()
 
         ends = []
 
-        for vertex in first.vertices:
-            if vertex.type == VertexInfo.EType.HIDDEN:
+        for type_, index in zip(first.types, first.indices):
+            if type_ == VertexInfo.EType.HIDDEN:
                 break
-            ends.append(vertex.index)
-            child.add_vertex(vertex.type, vertex.index)
+            ends.append(index)
+            child.add_vertex(type_, index)
 
         self.add_unique_vertices(child, ends)
 
@@ -102,76 +106,99 @@ class Crossover:
     def add_unique_vertices(self, genotype, ends):
         unique = set()
 
-        for info in genotype.edges:
-            if info.source not in ends and info.source not in unique:
-                unique.add(info.source)
+        for source, destination in zip(genotype.sources, genotype.destinations):
+            if source not in ends and source not in unique:
+                unique.add(source)
 
-            if info.destination not in ends and info.destination not in unique:
-                unique.add(info.destination)
+            if destination not in ends and destination not in unique:
+                unique.add(destination)
 
         for index in unique:
             genotype.add_vertex(VertexInfo.EType.HIDDEN, index)
 
     def speciation_distance(self, first, second):
-        copy_first = first.edges.copy()
-        copy_second = second.edges.copy()
-
-        match_first = []
-        match_second = []
-        disjoint_first = []
-        disjoint_second = []
-        excess_first = []
-        excess_second = []
-
-        genes_first = len(first.edges)
-        genes_second = len(second.edges)
-
-        invmax_first = first.edges[-1].innovation
-        invmax_second = second.edges[-1].innovation
+        match_first, match_second, disjoint_first, disjoint_second, excess_first, excess_second = \
+            self.align(first, second)
 
-        invmin = min(invmax_first, invmax_second)
+        weights_first = first.weights
+        weights_second = second.weights
 
         diff = 0.0
-
-        for i in range(genes_first):
-            for j in range(genes_second):
-                info_first = copy_first[i]
-                info_second = copy_second[j]
-
-                if info_first.innovation == info_second.innovation:
-                    weight_diff = abs(info_first.weight - info_second.weight)
-                    diff += weight_diff
-
-                    match_first.append(info_first)
-                    match_second.append(info_second)
-
-                    copy_first.remove(info_first)
-                    copy_second.remove(info_second)
-
-                    genes_first -= 1
-                    genes_second -= 1
-                    break
-
-        for info in copy_first:
-            if info.innovation > invmin:
-                excess_first.append(info)
-            else:
-                disjoint_first.append(info)
-
-        for info in copy_second:
-            if info.innovation > invmin:
-                excess_second.append(info)
-            else:
-                disjoint_second.append(info)
+        for position_first, position_second in zip(match_first, match_second):
+            diff += abs(weights_first[position_first] - weights_second[position_second])
 
         match = len(match_first)
         disjoint = len(disjoint_first) + len(disjoint_second)
         excess = len(excess_first) + len(excess_second)
 
-        n = max(len(first.edges), len(second.edges))
+        n = max(len(first.innovations), len(second.innovations))
 
         E = excess / n
         D = disjoint / n
         W = diff / match if match > 0 else 0
 
         return E * self.C1 + D * self.C2 + W * self.C3
+
+    @staticmethod
+    def genes(genotype):
+        # an innovation can sit on several edges of one genome; the k-th edge carrying it gets a column of its own,
+        # which pairs duplicates in edge order the way align does
+        innovations = np.asarray(genotype.innovations, dtype=np.int64)
+        order = np.argsort(innovations, kind='stable')
+        ordered = innovations[order]
+        occurrence = np.empty(len(innovations), dtype=np.int64)
+        occurrence[order] = np.arange(len(ordered)) - np.searchsorted(ordered, ordered)
+        return innovations * Crossover.OCCURRENCES + occurrence
+
+    @staticmethod
+    def columns(genotypes):
+        return np.unique(np.concatenate([Crossover.genes(genotype) for genotype in genotypes]
+                                        + [np.zeros(0, dtype=np.int64)]))
+
+    def distance_matrix(self, first, rows, second):
+        # distances from the selected rows of one encoding to every genome of another over the same columns
+        if not len(rows) or not len(second.genes):
+            return np.zeros((len(rows), len(second.genes)))
+
+        genes_first = first.genes[rows][:, None]
+        genes_second = second.genes[None, :]
+
+        match = first.presence[rows] @ second.presence.T
+
+        # genes up to the smaller of the two last innovations are matching or disjoint, the rest are excess
+        invmin = np.minimum(first.last[rows][:, None], second.last[None, :])
+        below = first.below[np.asarray(rows)[:, None], invmin] + second.below[np.arange(len(second.genes)), invmin]
+        disjoint = below - 2.0 * match
+        excess = genes_first + genes_second - below
+
+        diff = np.empty(match.shape)
+        for r, row in enumerate(rows):
+            slots = first.slots[row]
+            shared = np.abs(second.weights[:, slots] - first.weights[row, slots]) * second.presence[:, slots]
+            diff[r] = shared.sum(axis=1)
+
+        n = np.maximum(genes_first, genes_second)
+
+        E = excess / n
+        D = disjoint / n
+        W = np.divide(diff, match, out=np.zeros(match.shape), where=match > 0)
+
+        return E * self.C1 + D * self.C2 + W * self.C3
+
+
+class Encoding:
+    def __init__(self, genotypes, columns):
+        # innovation-indexed presence and weight rows, one per genome
+        self.presence = np.zeros((len(genotypes), len(columns)))
+        self.weights = np.zeros((len(genotypes), len(columns)))
+        self.slots = []
+
+        for g, genotype in enumerate(genotypes):
+            slots = np.searchsorted(columns, Crossover.genes(genotype))
+            self.presence[g, slots] = 1.0
+            self.weights[g, slots] = genotype.weights
+            self.slots.append(slots)
+
+        self.genes = self.presence.sum(axis=1)
+        self.last = np.array([slots.max(initial=0) for slots in self.slots], dtype=np.intp)
+        self.below = np.cumsum(self.presence, axis=1)
@@ -1,4 +1,10 @@
+import sys
+from array import array
+
+
 class VertexInfo:
+    __slots__ = ('type', 'index')
+
     class EType:
         INPUT = 0
         HIDDEN = 1
@@ -10,6 +16,8 @@ class VertexInfo:
 
 
 class EdgeInfo:
+    __slots__ = ('source', 'destination', 'weight', 'enabled', 'innovation')
+
     def __init__(self, s, d, w, e):
         self.source = s
         self.destination = d
@@ -18,49 +26,217 @@ class EdgeInfo:
         self.innovation = 0
 
 
+class VertexView:
+    __slots__ = ('genotype', 'position')
+
+    def __init__(self, genotype, position):
+        self.genotype = genotype
+        self.position = position
+
+    @property
+    def type(self):
+        return self.genotype.types[self.position]
+
+    @property
+    def index(self):
+        return self.genotype.indices[self.position]
+
+
+class EdgeView:
+    __slots__ = ('genotype', 'position')
+
+    def __init__(self, genotype, position):
+        self.genotype = genotype
+        self.position = position
+
+    @property
+    def source(self):
+        return self.genotype.sources[self.position]
+
+    @property
+    def destination(self):
+        return self.genotype.destinations[self.position]
+
+    @property
+    def weight(self):
+        return self.genotype.weights[self.position]
+
+    @weight.setter
+    def weight(self, value):
+        self.genotype.weights[self.position] = value
+        self.genotype.touch(self.position)
+
+    @property
+    def enabled(self):
+        return bool(self.genotype.enabled[self.position])
+
+    @enabled.setter
+    def enabled(self, value):
+        self.genotype.enabled[self.position] = value
+        self.genotype.touch()
+
+    @property
+    def innovation(self):
+        return self.genotype.innovations[self.position]
+
+    @innovation.setter
+    def innovation(self, value):
+        self.genotype.innovations[self.position] = value
+        self.genotype.touch()
+
+
+class Genes:
+    __slots__ = ('genotype', 'column', 'view')
+
+    def __init__(self, genotype, column, view):
+        self.genotype = genotype
+        self.column = column
+        self.view = view
+
+    def __len__(self):
+        return len(self.column)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self.view(self.genotype, p) for p in range(*position.indices(len(self.column)))]
+
+        if position < 0:
+            position += len(self.column)
+        if not 0 <= position < len(self.column):
+            raise IndexError(position)
+
+        return self.view(self.genotype, position)
+
+    def __iter__(self):
+        return (self.view(self.genotype, p) for p in range(len(self.column)))
+
+    def copy(self):
+        return list(self)
+
+
 class Genotype:
+    created = 0
+
     def __init__(self):
-        self.vertices = []
-        self.edges = []
+        # ids are never reused within a run, so journals can refer to a genome across generations
+        self.id = Genotype.created
+        Genotype.created += 1
+        # genes live in parallel typed arrays; vertices and edges are views over them
+        self.types = array('b')
+        self.indices = array('i')
+        self.sources = array('i')
+        self.destinations = array('i')
+        self.weights = array('d')
+        self.enabled = array('b')
+        self.innovations = array('i')
+        self.links = set()
         self.inputs = 0
         self.externals = 0
         self.bracket = 0
         self.fitness = 0.0
         self.adjustedFitness = 0.0
+        # the built phenotype is kept until the structure changes; weight edits are patched into it
+        self.phenotype = None
+        self.version = 0
+        self.reshaped = True
+        self.reweighted = set()
+
+    @property
+    def vertices(self):
+        return Genes(self, self.indices, VertexView)
+
+    @property
+    def edges(self):
+        return Genes(self, self.innovations, EdgeView)
+
+    def touch(self, edge=None):
+        # every change to the genes goes through here, so version always tells journals and caches what changed
+        self.version += 1
+        if edge is None:
+            self.reshaped = True
+        else:
+            self.reweighted.add(edge)
 
     def add_vertex(self, type, index):
-        v = VertexInfo(type, index)
-        self.vertices.append(v)
+        self.types.append(type)
+        self.indices.append(index)
+        self.touch()
 
-        if v.type != VertexInfo.EType.HIDDEN:
+        if type != VertexInfo.EType.HIDDEN:
             self.externals += 1
 
-        if v.type == VertexInfo.EType.INPUT:
+        if type == VertexInfo.EType.INPUT:
             self.inputs += 1
 
     def add_edge(self, source, destination, weight, enabled, innovation=None):
-        e = EdgeInfo(source, destination, weight, enabled)
-        if innovation is not None:
-            e.innovation = innovation
-        self.edges.append(e)
+        self.sources.append(source)
+        self.destinations.append(destination)
+        self.weights.append(weight)
+        self.enabled.append(enabled)
+        self.innovations.append(0 if innovation is None else innovation)
+        self.links.add((source, destination))
+        self.touch()
 
     def clone(self):
         copy = Genotype()
 
-        for v in self.vertices:
-            copy.add_vertex(v.type, v.index)
-
-        for e in self.edges:
-            copy.add_edge(e.source, e.destination, e.weight, e.enabled, e.innovation)
+        copy.types = array('b', self.types)
+        copy.indices = array('i', self.indices)
+        copy.sources = array('i', self.sources)
+        copy.destinations = array('i', self.destinations)
+        copy.weights = array('d', self.weights)
+        copy.enabled = array('b', self.enabled)
+        copy.innovations = array('i', self.innovations)
+        copy.links = set(self.links)
+        copy.inputs = self.inputs
+        copy.externals = self.externals
 
         return copy
 
+    def pack(self):
+        columns = (self.types, self.indices, self.sources, self.destinations, self.weights, self.enabled,
+                   self.innovations)
+        # packed columns are little-endian on every host, like the headers written around them
+        if sys.byteorder == 'big':
+            columns = [array(column.typecode, column) for column in columns]
+            for column in columns:
+                column.byteswap()
+        return tuple(column.tobytes() for column in columns)
+
+    @staticmethod
+    def unpack(packed):
+        genotype = Genotype()
+
+        genotype.types.frombytes(packed[0])
+        genotype.indices.frombytes(packed[1])
+        genotype.sources.frombytes(packed[2])
+        genotype.destinations.frombytes(packed[3])
+        genotype.weights.frombytes(packed[4])
+        genotype.enabled.frombytes(packed[5])
+        genotype.innovations.frombytes(packed[6])
+        if sys.byteorder == 'big':
+            for column in (genotype.types, genotype.indices, genotype.sources, genotype.destinations,
+                           genotype.weights, genotype.enabled, genotype.innovations):
+                column.byteswap()
+        genotype.links = set(zip(genotype.sources, genotype.destinations))
+        genotype.inputs = genotype.types.count(VertexInfo.EType.INPUT)
+        genotype.externals = len(genotype.types) - genotype.types.count(VertexInfo.EType.HIDDEN)
+
+        return genotype
+
     def sort_topology(self):
         self.sort_vertices()
         self.sort_edges()
 
     def sort_vertices(self):
-        self.vertices.sort(key=lambda v: v.index)
+        order = sorted(range(len(self.indices)), key=self.indices.__getitem__)
+        self.types = array('b', [self.types[i] for i in order])
+        self.indices = array('i', [self.indices[i] for i in order])
+        self.touch()
 
     def sort_edges(self):
-        self.edges.sort(key=lambda e: e.innovation)
+        order = sorted(range(len(self.innovations)), key=self.innovations.__getitem__)
+        for name in ('sources', 'destinations', 'weights', 'enabled', 'innovations'):
+            column = getattr(self, name)
+            setattr(self, name, array(column.typecode, [column[i] for i in order]))
+        self.touch()
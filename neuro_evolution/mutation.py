@@ -1,4 +1,6 @@
 import random
+import sys
+from array import array
 
 from neuro_evolution.genotype import VertexInfo, EdgeInfo
 
@@ -21,7 +23,9 @@ class Mutation:
         self.MUTATE_WEIGHT = 2.0
         self.PETRUB_CHANCE = 0.9
         self.SHIFT_STEP = 0.1
+        self.LINK_ATTEMPTS = 32
         self.historical = []
+        self.markings = {}
 
     def __new__(cls):
         if cls.instance is None:
@@ -29,18 +33,38 @@ class Mutation:
         return cls.instance
 
     def register_marking(self, info):
-        for marking in self.historical:
-            if marking.source == info.source and marking.destination == info.destination:
-                return marking.order
+        order = self.markings.get((info.source, info.destination))
+        if order is not None:
+            return order
 
+        self.add_marking(len(self.historical), info.source, info.destination)
+
+        return len(self.historical) - 1
+
+    def add_marking(self, order, source, destination):
         creation = Marking()
-        creation.order = len(self.historical)
-        creation.source = info.source
-        creation.destination = info.destination
+        creation.order = order
+        creation.source = source
+        creation.destination = destination
 
         self.historical.append(creation)
-
-        return len(self.historical) - 1
+        self.markings.setdefault((source, destination), order)
+
+    def export_markings(self, start=0):
+        packed = array('i')
+        for marking in self.historical[start:]:
+            packed.extend((marking.order, marking.source, marking.destination))
+        if sys.byteorder == 'big':
+            packed.byteswap()
+        return packed.tobytes()
+
+    def import_markings(self, packed):
+        markings = array('i')
+        markings.frombytes(packed)
+        if sys.byteorder == 'big':
+            markings.byteswap()
+        for i in range(0, len(markings), 3):
+            self.add_marking(markings[i], markings[i + 1], markings[i + 2])
 
     def mutate_all(self, genotype):
         for _ in range(int(self.MUTATE_WEIGHT)):
@@ -55,41 +79,30 @@ class Mutation:
             self.mutate_enable(genotype)
 
     def mutate_link(self, genotype):
-        vertex_count = len(genotype.vertices)
-        edge_count = len(genotype.edges)
-        potential = []
+        vertices = list(zip(genotype.types, genotype.indices))
+        sources = [index for type_, index in vertices if type_ != VertexInfo.EType.OUTPUT]
+        destinations = [index for type_, index in vertices if type_ != VertexInfo.EType.INPUT]
 
-        for i in range(vertex_count):
-            for j in range(vertex_count):
-                source = genotype.vertices[i].index
-                destination = genotype.vertices[j].index
-                t1 = genotype.vertices[i].type
-                t2 = genotype.vertices[j].type
-
-                if t1 == VertexInfo.EType.OUTPUT or t2 == VertexInfo.EType.INPUT:
-                    continue
-
-                if source == destination:
-                    continue
-
-                search = False
+        if not sources or not destinations:
+            return
 
-                for k in range(edge_count):
-                    edge = genotype.edges[k]
-                    if edge.source == source and edge.destination == destination:
-                        search = True
-                        break
+        # rejection sampling is uniform over the free pairs; dense genomes fall back to counting them out
+        for _ in range(self.LINK_ATTEMPTS):
+            source = random.choice(sources)
+            destination = random.choice(destinations)
+            if source != destination and (source, destination) not in genotype.links:
+                break
+        else:
+            potential = [(source, destination) for source in sources for destination in destinations
+                         if source != destination and (source, destination) not in genotype.links]
 
-                if not search:
-                    weight = random.random() * 4.0 - 2.0
-                    creation = EdgeInfo(source, destination, weight, True)
-                    potential.append(creation)
+            if not potential:
+                return
 
-        if not potential:
-            return
+            source, destination = potential[random.randint(0, len(potential) - 1)]
 
-        selection = random.randint(0, len(potential) - 1)
-        mutation = potential[selection]
+        weight = random.random() * 4.0 - 2.0
+        mutation = EdgeInfo(source, destination, weight, True)
         mutation.innovation = self.register_marking(mutation)
 
         genotype.add_edge(mutation.source, mutation.destination, mutation.weight, mutation.enabled, mutation.innovation)
@@ -25,6 +25,30 @@ class NetworkFactory:
 
         return network
 
+    @staticmethod
+    def create_phenotype(genotype):
+        physical = Phenotype()
+        physical.inscribe_genotype(genotype)
+        physical.process_graph()
+        physical.compile()
+        return physical
+
+    @staticmethod
+    def refresh_phenotype(genotype):
+        physical = genotype.phenotype
+
+        if physical is None or genotype.reshaped:
+            physical = NetworkFactory.create_phenotype(genotype)
+        else:
+            for position in genotype.reweighted:
+                physical.patch_weight(position, genotype.edges[position].weight)
+            physical.reset_graph()
+
+        genotype.phenotype = physical
+        genotype.reshaped = False
+        genotype.reweighted.clear()
+        return physical
+
     @staticmethod
     def register_base_markings(inputs, outputs):
         for i in range(inputs):
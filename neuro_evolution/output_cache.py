@@ -0,0 +1,39 @@
+from collections import OrderedDict
+
+
+class OutputCache:
+    def __init__(self, size):
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def fingerprint(X):
+        return tuple(X)
+
+    def get(self, key):
+        Y = self.entries.get(key)
+
+        if Y is None:
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return Y
+
+    def put(self, key, Y):
+        self.entries[key] = Y
+
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+    def collect(self):
+        counters = (self.hits, self.misses)
+        self.hits = 0
+        self.misses = 0
+        return counters
@@ -1,5 +1,7 @@
 import math
 
+from neuro_evolution.output_cache import OutputCache
+
 
 class Vertex:
     class EType:
@@ -29,31 +31,42 @@ class Edge:
 
 
 class Phenotype:
+    COMPILED = True
+    REPEATS = 10
+    TOLERANCE = 1e-6
+
     def __init__(self):
         self.vertices = []
         self.edges = []
+        self.slots = {}
         self.vertices_inputs = []
         self.vertices_outputs = []
+        self.order = []
+        self.recurrent = False
         self.score = 0
+        self.compiled = None
+        self.cache = None
 
     def inscribe_genotype(self, code):
         self.vertices.clear()
         self.edges.clear()
+        self.slots.clear()
 
-        for v in code.vertices:
-            self.add_vertex(v.type, v.index)
+        for type_, index in zip(code.types, code.indices):
+            self.add_vertex(type_, index)
 
-        for e in code.edges:
-            self.add_edge(e.source, e.destination, e.weight, e.enabled)
+        for source, destination, weight, enabled in zip(code.sources, code.destinations, code.weights, code.enabled):
+            self.add_edge(source, destination, weight, bool(enabled))
 
     def add_vertex(self, type_, index):
         v = Vertex(type_, index)
+        self.slots[index] = len(self.vertices)
         self.vertices.append(v)
 
     def add_edge(self, source, destination, weight, enabled):
         e = Edge(source, destination, weight, enabled)
         self.edges.append(e)
-        self.vertices[e.destination].incoming.append(e)
+        self.vertices[self.slots[e.destination]].incoming.append(e)
 
     def process_graph(self):
         for vertex in self.vertices:
@@ -62,41 +75,126 @@ class Phenotype:
             elif vertex.type == Vertex.EType.OUTPUT:
                 self.vertices_outputs.append(vertex)
 
+        outgoing = {vertex.index: [] for vertex in self.vertices}
+        for edge in self.edges:
+            if edge.enabled:
+                outgoing[edge.source].append(edge)
+
+        # depth-first search from the inputs; an edge back onto the search stack closes a cycle
+        UNSEEN, OPEN, DONE = 0, 1, 2
+        state = {vertex.index: UNSEEN for vertex in self.vertices}
+        postorder = []
+
+        for root in self.vertices_inputs + [v for v in self.vertices if v.type != Vertex.EType.INPUT]:
+            if state[root.index] != UNSEEN:
+                continue
+
+            state[root.index] = OPEN
+            stack = [(root.index, iter(outgoing[root.index]))]
+
+            while stack:
+                index, edges = stack[-1]
+
+                for edge in edges:
+                    if state[edge.destination] == OPEN:
+                        edge.type = Edge.EType.RECURRENT
+                        continue
+
+                    edge.type = Edge.EType.FORWARD
+
+                    if state[edge.destination] == UNSEEN:
+                        state[edge.destination] = OPEN
+                        stack.append((edge.destination, iter(outgoing[edge.destination])))
+                        break
+                else:
+                    state[index] = DONE
+                    postorder.append(index)
+                    stack.pop()
+
+        rank = {index: r for r, index in enumerate(reversed(postorder))}
+
+        for edge in self.edges:
+            if not edge.enabled:
+                forward = rank[edge.source] < rank[edge.destination]
+                edge.type = Edge.EType.FORWARD if forward else Edge.EType.RECURRENT
+
+        order = [self.vertices[self.slots[index]] for index in reversed(postorder)]
+        self.order = [vertex for vertex in order if vertex.type != Vertex.EType.INPUT and vertex.incoming]
+        self.recurrent = any(edge.enabled and edge.type == Edge.EType.RECURRENT for edge in self.edges)
+
+    def compile(self):
+        from neuro_evolution.compiled_phenotype import CompiledPhenotype
+        self.compiled = CompiledPhenotype(self)
+
+    def patch_weight(self, position, weight):
+        self.edges[position].weight = weight
+
+        if self.compiled is not None:
+            self.compiled.patch(position, weight)
+
+        if self.cache is not None:
+            self.cache.clear()
+
+    def enable_cache(self, size):
+        self.cache = OutputCache(size)
+
     def reset_graph(self):
         for vertex in self.vertices:
             vertex.value = 0.0
 
+        if self.compiled is not None:
+            self.compiled.reset()
+
     def propagate(self, X):
-        repeats = 10
+        if self.cache is None:
+            return self.forward(X)
 
-        for _ in range(repeats):
-            for i, vertex in enumerate(self.vertices_inputs):
-                vertex.value = X[i]
+        key = self.cache.fingerprint(X)
+        Y = self.cache.get(key)
 
-            for vertex in self.vertices:
-                if vertex.type == Vertex.EType.OUTPUT:
-                    continue
+        if Y is None:
+            Y = self.forward(X)
+            self.cache.put(key, Y)
 
-                for edge in vertex.incoming:
-                    vertex.value += self.vertices[edge.source].value * edge.weight * (1.0 if edge.enabled else 0.0)
+        return Y
+
+    def forward(self, X):
+        if self.COMPILED and self.compiled is not None:
+            return self.compiled.propagate(X)
+
+        for i, vertex in enumerate(self.vertices_inputs):
+            vertex.value = X[i]
 
-                if vertex.incoming:
-                    vertex.value = self.sigmoid(vertex.value)
+        # forward edges always read this pass's values; recurrent edges read the previous pass
+        for _ in range(self.REPEATS):
+            delta = 0.0
 
-            Y = [0.0] * len(self.vertices_outputs)
-            for vertex in self.vertices_outputs:
+            for vertex in self.order:
+                total = 0.0
                 for edge in vertex.incoming:
-                    vertex.value += self.vertices[edge.source].value * edge.weight * (1.0 if edge.enabled else 0.0)
+                    if edge.enabled:
+                        total += self.vertices[self.slots[edge.source]].value * edge.weight
+
+                value = self.sigmoid(total)
+                delta = max(delta, abs(value - vertex.value))
+                vertex.value = value
+
+            if not self.recurrent or delta < self.TOLERANCE:
+                break
+
+        Y = [0.0] * len(self.vertices_outputs)
+        for vertex in self.vertices_outputs:
+            if vertex.incoming:
+                Y.append(vertex.value)
 
-                if vertex.incoming:
-                    vertex.value = self.sigmoid(vertex.value)
-                    Y.append(vertex.value)
+        return Y
 
-            if _ == repeats - 1:
-                return Y
+    def propagate_batch(self, X, values):
+        if self.compiled is None:
+            self.compile()
 
-        return []
+        return self.compiled.propagate_batch(X, values)
 
     @staticmethod
     def sigmoid(x):
-        return 1.0 / (1.0 + math.exp(-1.0 * x))
+        return 1.0 / (1.0 + math.exp(min(-1.0 * x, 709.0)))
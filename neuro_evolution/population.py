@@ -1,12 +1,15 @@
+import os
 import random
 import math
-from typing import List
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
 
-from neuro_evolution.crossover import Crossover
+import numpy as np
+
+from neuro_evolution.crossover import Crossover, Encoding
 from neuro_evolution.genotype import Genotype
 from neuro_evolution.mutation import Mutation
 from neuro_evolution.network_factory import NetworkFactory
-from neuro_evolution.phenotype import Phenotype
 
 
 class Species:
@@ -17,6 +20,10 @@ class Species:
         self.fitnessSum: float = 0.0
 
     def breed(self):
+        child, inherited = self.reproduce(*self.plan())
+        return child
+
+    def plan(self):
         roll = random.random()
         if roll < Crossover.CROSSOVER_CHANCE and len(self.members) > 1:
             s1 = random.randint(0, len(self.members) - 1)
@@ -25,15 +32,28 @@ class Species:
                 s2 += 1
             if s1 > s2:
                 s1, s2 = s2, s1
-            child = Crossover.instance.produce_offspring(self.members[s1], self.members[s2])
-            Mutation.instance.mutate_all(child)
-            selection = random.randint(0, len(self.members) - 1)
-            return child
+            parents = (self.members[s1], self.members[s2])
         else:
             selection = random.randint(0, len(self.members) - 1)
-            child = self.members[selection].clone()
-            Mutation.instance.mutate_all(child)
-            return child
+            parents = (self.members[selection],)
+        return parents, random.getrandbits(32)
+
+    @staticmethod
+    def reproduce(parents, seed):
+        # every child draws from its own seeded stream, so it comes out the same in any process
+        state = random.getstate()
+        random.seed(seed)
+
+        if len(parents) > 1:
+            child = Crossover.instance.produce_offspring(parents[0], parents[1])
+        else:
+            child = parents[0].clone()
+
+        inherited = len(child.edges)
+        Mutation.instance.mutate_all(child)
+
+        random.setstate(state)
+        return child, inherited
 
     def sort_members(self):
         self.members.sort(key=lambda x: x.adjustedFitness, reverse=True)
@@ -66,6 +86,8 @@ class Population:
         self.species = []
         self.genetics = []
         self.population = []
+        self.BREED_WORKERS = os.cpu_count() or 1
+        self.executor: Optional[ProcessPoolExecutor] = None
 
     def __new__(cls):
         if cls.instance is None:
@@ -79,7 +101,7 @@ class Population:
         for _ in range(self.POPULATION_SIZE):
             genotype = NetworkFactory().create_base_genotype(inputs, outputs)
             self.genetics.append(genotype)
-            self.add_to_species(genotype)
+        self.speciate(self.genetics)
         NetworkFactory().register_base_markings(inputs, outputs)
         for genotype in self.genetics:
             Mutation.instance.mutate_all(genotype)
@@ -94,25 +116,72 @@ class Population:
                 del self.species[i]
         self.update_staleness()
         fitness_sum = sum(s.fitnessSum for s in self.species)
-        children = []
+        plans = []
         for s in self.species:
             build = int(self.POPULATION_SIZE * (s.fitnessSum / fitness_sum)) - 1
             for _ in range(build):
-                child = s.breed()
-                children.append(child)
-        while self.POPULATION_SIZE > len(self.species) + len(children):
-            child = random.choice(self.species).breed()
-            children.append(child)
+                plans.append(s.plan())
+        while self.POPULATION_SIZE > len(self.species) + len(plans):
+            plans.append(random.choice(self.species).plan())
+        children = self.breed(plans)
         for s in self.species:
             s.cull_to_one()
-        for child in children:
-            self.add_to_species(child)
+        self.speciate(children)
         self.genetics.clear()
         for s in self.species:
             self.genetics.extend(s.members)
         self.inscribe_population()
         self.GENERATION += 1
 
+    def start_workers(self):
+        if self.executor is None:
+            rates = {key: value for key, value in vars(Mutation.instance).items() if key.isupper()}
+            self.executor = ProcessPoolExecutor(max_workers=self.BREED_WORKERS,
+                                                initializer=Population.initialise_worker, initargs=(rates,))
+
+    def stop_workers(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def breed(self, plans):
+        if self.BREED_WORKERS <= 1 or not plans:
+            offspring = [Species.reproduce(parents, seed) for parents, seed in plans]
+        else:
+            self.start_workers()
+            packed = {}
+            for parents, seed in plans:
+                for parent in parents:
+                    if id(parent) not in packed:
+                        packed[id(parent)] = parent.pack()
+
+            jobs = [([packed[id(parent)] for parent in parents], seed) for parents, seed in plans]
+            chunksize = max(1, len(jobs) // (self.BREED_WORKERS * 4))
+            offspring = [(Genotype.unpack(child), inherited)
+                         for child, inherited in self.executor.map(Population.breed_packed, *zip(*jobs),
+                                                                   chunksize=chunksize)]
+
+        # workers number new links provisionally; registering them here in child order gives the same
+        # innovations a serial run would have handed out
+        children = []
+        for child, inherited in offspring:
+            for edge in child.edges[inherited:]:
+                edge.innovation = Mutation.instance.register_marking(edge)
+            children.append(child)
+
+        return children
+
+    @staticmethod
+    def initialise_worker(rates):
+        Mutation()
+        Crossover()
+        vars(Mutation.instance).update(rates)
+
+    @staticmethod
+    def breed_packed(parents, seed):
+        child, inherited = Species.reproduce([Genotype.unpack(parent) for parent in parents], seed)
+        return child.pack(), inherited
+
     def calculate_adjusted_fitness(self):
         for s in self.species:
             for member in s.members:
@@ -136,28 +205,32 @@ class Population:
         for genotype in self.genetics:
             genotype.fitness = 0.0
             genotype.adjustedFitness = 0.0
-            physical = Phenotype()
-            physical.inscribe_genotype(genotype)
-            physical.process_graph()
+            physical = NetworkFactory.refresh_phenotype(genotype)
             self.population.append(physical)
 
     def add_to_species(self, genotype):
-        if not self.species:
+        self.speciate([genotype])
+
+    def speciate(self, genotypes):
+        # each genome joins the first species whose representative is close enough; a genome that founds a
+        # species becomes a representative for the genomes after it
+        representatives = [s.members[0] for s in self.species]
+        columns = Crossover.columns(representatives + genotypes)
+        known = Encoding(representatives, columns)
+        pending = Encoding(genotypes, columns)
+
+        distances = Crossover.instance.distance_matrix(known, range(len(representatives)), pending)
+
+        for g, genotype in enumerate(genotypes):
+            found = np.flatnonzero(distances[:, g] < Crossover.DISTANCE)
+            if len(found):
+                self.species[found[0]].members.append(genotype)
+                continue
+
             new_species = Species()
             new_species.members.append(genotype)
             self.species.append(new_species)
-        else:
-            found = False
-            for s in self.species:
-                distance = Crossover.instance.speciation_distance(s.members[0], genotype)
-                if distance < Crossover.DISTANCE:
-                    s.members.append(genotype)
-                    found = True
-                    break
-            if not found:
-                new_species = Species()
-                new_species.members.append(genotype)
-                self.species.append(new_species)
+            distances = np.vstack((distances, Crossover.instance.distance_matrix(pending, [g], pending)))
 
     @staticmethod
     def sort_genotype_by_fitness(a, b):
@@ -0,0 +1,114 @@
+from typing import List
+
+import numpy as np
+
+from neuro_evolution.compiled_phenotype import row_sum, sigmoid
+from neuro_evolution.phenotype import Phenotype
+
+
+def merge(blocks, offsets):
+    # CSR blocks of separate genomes laid end to end: rows move by the genome's slot offset, edges by the edge count
+    # of the blocks before them
+    members = []
+    indptr = [np.zeros(1, dtype=np.intp)]
+    starts = []
+    filled = []
+    rows = 0
+    edges = 0
+    for (block_members, block_indptr, block_starts, block_filled), offset in zip(blocks, offsets):
+        members.append(block_members + offset)
+        indptr.append(block_indptr[1:] + edges)
+        starts.append(block_starts + edges)
+        filled.append((np.arange(len(block_members)) if block_filled is None else block_filled) + rows)
+        rows += len(block_members)
+        edges += block_indptr[-1]
+
+    filled = np.concatenate(filled)
+    return (np.concatenate(members), np.concatenate(indptr), np.concatenate(starts),
+            None if len(filled) == rows else filled)
+
+
+class PopulationEvaluator:
+    def __init__(self, phenotypes: List[Phenotype]):
+        for phenotype in phenotypes:
+            if phenotype.compiled is None:
+                phenotype.compile()
+
+        compiled = [phenotype.compiled for phenotype in phenotypes]
+        base = np.concatenate(([0], np.cumsum([c.size for c in compiled]))).astype(np.intp)
+
+        # every genome owns a slice of one value row, and the genomes' programs are laid side by side once here, so
+        # any mix of rows runs the same program with nothing rebuilt per call
+        self.phenotypes = phenotypes
+        self.index = {id(phenotype): g for g, phenotype in enumerate(phenotypes)}
+        self.size = int(base[-1])
+        self.inputs = [c.inputs + base[g] for g, c in enumerate(compiled)]
+        self.reported = [c.reported + base[g] for g, c in enumerate(compiled)]
+        self.padding = [c.padding for c in compiled]
+        self.cyclic = np.array([c.recurrent for c in compiled], dtype=bool)
+        self.owned = np.zeros((len(compiled), self.size))
+        for g in range(len(compiled)):
+            self.owned[g, base[g]:base[g + 1]] = 1.0
+
+        recurrent = np.flatnonzero(self.cyclic)
+        self.recurrent = len(recurrent) > 0
+        if self.recurrent:
+            self.feedback = merge([compiled[g].feedback for g in recurrent], base[recurrent])
+            self.recurrent_source = np.concatenate([compiled[g].recurrent_source + base[g] for g in recurrent])
+            self.recurrent_weight = np.concatenate([compiled[g].recurrent_weight for g in recurrent])
+
+        self.levels = []
+        for d in range(max((len(c.levels) for c in compiled), default=0)):
+            present = [g for g, c in enumerate(compiled) if d < len(c.levels)]
+            block = merge([compiled[g].levels[d][0] for g in present], base[present])
+            source = np.concatenate([compiled[g].levels[d][1] + base[g] for g in present])
+            weight = np.concatenate([compiled[g].levels[d][2] for g in present])
+            self.levels.append((block, source, weight))
+
+    def genome(self, phenotype: Phenotype) -> int:
+        return self.index[id(phenotype)]
+
+    def step(self, values):
+        if self.recurrent:
+            feedback = np.zeros(values.shape)
+            feedback[:, self.feedback[0]] = row_sum(self.feedback,
+                                                    values[:, self.recurrent_source] * self.recurrent_weight)
+
+        for block, source, weight in self.levels:
+            total = row_sum(block, values[:, source] * weight)
+            if self.recurrent:
+                total += feedback[:, block[0]]
+            values[:, block[0]] = sigmoid(total)
+
+    def evaluate(self, networks, X, values):
+        # row r runs genome networks[r] and carries its activations in values[r], which is updated in place
+        networks = np.asarray(networks, dtype=np.intp)
+        X = np.asarray(X, dtype=np.float64)
+        genomes = {g: np.flatnonzero(networks == g) for g in np.unique(networks).tolist()}
+
+        for g, rows in genomes.items():
+            values[rows[:, None], self.inputs[g]] = X[rows, :len(self.inputs[g])]
+
+        if not self.recurrent:
+            self.step(values)
+        else:
+            # acyclic genomes settle in one pass; a cyclic row iterates until its own slice stops moving, the other
+            # genomes' slices of a row are never read
+            rows = np.arange(len(networks))
+            for _ in range(Phenotype.REPEATS):
+                current = values[rows]
+                previous = current.copy()
+                self.step(current)
+                values[rows] = current
+
+                moved = np.max(np.abs(current - previous) * self.owned[networks[rows]], axis=1)
+                rows = rows[self.cyclic[networks[rows]] & (moved >= Phenotype.TOLERANCE)]
+                if not len(rows):
+                    break
+
+        Y = [None] * len(networks)
+        for g, rows in genomes.items():
+            for r, row in zip(rows.tolist(), values[rows[:, None], self.reported[g]].tolist()):
+                Y[r] = self.padding[g] + row
+
+        return Y
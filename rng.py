@@ -1,35 +1,94 @@
 import random
 
-from typing import List
+from typing import List, Optional
+
+import numpy as np
 
 from neuro_evolution.phenotype import Phenotype
 from neuro_evolution.genotype import Genotype
 from monopoly.neural_player import NeuralPlayer
 
 
+class Stream:
+    BLOCK = 256
+
+    def __init__(self, sequence):
+        # draws are generated in blocks and consumed from plain lists, which is far cheaper than a call per draw
+        self.generator = np.random.Generator(np.random.PCG64(sequence))
+        self.uniforms: List[float] = []
+        self.rolls: List[int] = []
+
+    def random(self) -> float:
+        if not self.uniforms:
+            self.uniforms = self.generator.random(self.BLOCK).tolist()
+        return self.uniforms.pop()
+
+    def roll(self):
+        if not self.rolls:
+            self.rolls = self.generator.integers(1, 7, 2 * self.BLOCK).tolist()
+        return self.rolls.pop(), self.rolls.pop()
+
+    def randrange(self, start, stop):
+        return start + int(self.random() * (stop - start))
+
+    def randint(self, a, b):
+        return self.randrange(a, b + 1)
+
+    def sample(self, population, k):
+        pool = list(population)
+        for i in range(k):
+            j = self.randrange(i, len(pool))
+            pool[i], pool[j] = pool[j], pool[i]
+        return pool[:k]
+
+
 class RNG:
     instance = None
 
+    SEED: Optional[int] = None  # master seed of the run; None draws fresh entropy
+
     def __init__(self):
-        self.gen = random.Random()
+        # boards construct the singleton too, which must not restart the master sequence
+        if getattr(self, 'master', None) is None:
+            self.reseed(self.SEED)
+
+    def reseed(self, seed: Optional[int]):
+        self.master = np.random.SeedSequence(seed)
+        self.gen = random.Random(int(self.master.generate_state(1)[0]))
 
     def __new__(cls):
         if cls.instance is None:
             cls.instance = super().__new__(cls)
         return cls.instance
 
-    def shuffle_card_entries(self, cards):
+    def spawn(self) -> np.random.SeedSequence:
+        return self.master.spawn(1)[0]
+
+    @staticmethod
+    def child(sequence: np.random.SeedSequence, k) -> np.random.SeedSequence:
+        return np.random.SeedSequence(sequence.entropy, spawn_key=sequence.spawn_key + (k,),
+                                      pool_size=sequence.pool_size)
+
+    @staticmethod
+    def streams(sequence: np.random.SeedSequence):
+        # every game plays on its own dice stream and trade stream, independent of every other game
+        dice, trades = sequence.spawn(2)
+        return Stream(dice), Stream(trades)
+
+    def shuffle_card_entries(self, cards, gen=None):
+        gen = self.gen if gen is None else gen
         shuffle = []
         while cards:
-            r = self.gen.randint(0, len(cards) - 1)
+            r = gen.randint(0, len(cards) - 1)
             shuffle.append(cards.pop(r))
         return shuffle
 
-    def shuffle_neural_players(self, players: List[NeuralPlayer]) -> List[NeuralPlayer]:
+    def shuffle_neural_players(self, players: List[NeuralPlayer], gen=None) -> List[NeuralPlayer]:
+        gen = self.gen if gen is None else gen
         container: List[NeuralPlayer] = list(players)
         shuffle: List[NeuralPlayer] = []
         while container:
-            r = self.gen.randint(0, len(container) - 1)
+            r = gen.randint(0, len(container) - 1)
             shuffle.append(container.pop(r))
         return shuffle
 
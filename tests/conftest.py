@@ -0,0 +1,46 @@
+import random
+
+import pytest
+
+from analytics import Analytics
+from neuro_evolution.crossover import Crossover
+from neuro_evolution.mutation import Mutation
+from neuro_evolution.network_factory import NetworkFactory
+from neuro_evolution.population import Population
+from rng import RNG
+
+
+@pytest.fixture
+def evolution():
+    # the singletons are re-initialised for every test, which clears markings, species and population
+    Analytics()
+    RNG()
+    NetworkFactory()
+    Mutation()
+    Crossover()
+    Population()
+
+    yield Population.instance
+
+    Population.instance.stop_workers()
+
+
+def grow(count, inputs=8, outputs=3, rounds=6, seed=0):
+    random.seed(seed)
+    NetworkFactory.register_base_markings(inputs, outputs)
+
+    # registering re-initialises Mutation, and its default rates are fractions that mutate_all truncates to zero
+    # structural mutations
+    Mutation.instance.MUTATE_LINK = 3
+    Mutation.instance.MUTATE_NODE = 1
+    Mutation.instance.MUTATE_DISABLE = 1
+    Mutation.instance.MUTATE_ENABLE = 1
+
+    genotypes = []
+    for _ in range(count):
+        genotype = NetworkFactory.create_base_genotype(inputs, outputs)
+        for _ in range(rounds):
+            Mutation.instance.mutate_all(genotype)
+        genotypes.append(genotype)
+
+    return genotypes
@@ -0,0 +1,71 @@
+import numpy as np
+
+from tournament import Tournament
+
+
+def stops(tournament, rng, chances, luck=0.0):
+    # plays a bracket of simulated games batch by batch, looking after every batch like execute_tournament_round
+    totals = np.zeros(4)
+    moments = np.zeros((4, 4))
+    played = 0
+    looked = 0
+    size = tournament.batch_size()
+
+    while played < tournament.ROUND_SIZE:
+        winners = rng.choice(4, size=size, p=chances)
+        if tournament.SEEDED:
+            # the four rotations of a stream share their dice, which here favour the same player in all of them
+            favourites = np.repeat(rng.choice(4, size=size // 4, p=chances), 4)
+            winners = np.where(rng.random(size) < luck, favourites, winners)
+
+        scores = np.zeros((size, 4))
+        scores[np.arange(size), winners] = 1.0
+        samples = Tournament.samples(scores, played, tournament.SEEDED)
+        totals += scores.sum(axis=0)
+        moments += samples.T @ samples
+        played += size
+
+        if played >= tournament.MIN_GAMES:
+            if tournament.decided(totals, moments, played, looked, 4 if tournament.SEEDED else 1):
+                return True
+            looked = played
+
+    return False
+
+
+def test_equal_players_rarely_stop_early():
+    tournament = Tournament()
+    rng = np.random.default_rng(23)
+
+    rate = np.mean([stops(tournament, rng, [0.5, 0.5, 0.0, 0.0]) for _ in range(500)])
+
+    assert rate <= 1.0 - tournament.CONFIDENCE + 0.01
+
+
+def test_clear_leader_stops_early():
+    tournament = Tournament()
+    rng = np.random.default_rng(23)
+
+    rate = np.mean([stops(tournament, rng, [0.6, 0.4, 0.0, 0.0]) for _ in range(100)])
+
+    assert rate >= 0.9
+
+
+def test_seeded_equal_players_rarely_stop_early():
+    tournament = Tournament()
+    tournament.SEEDED = True
+    rng = np.random.default_rng(23)
+
+    rate = np.mean([stops(tournament, rng, [0.5, 0.5, 0.0, 0.0], luck=0.8) for _ in range(500)])
+
+    assert rate <= 1.0 - tournament.CONFIDENCE + 0.01
+
+
+def test_seeded_clear_leader_stops_early():
+    tournament = Tournament()
+    tournament.SEEDED = True
+    rng = np.random.default_rng(23)
+
+    rate = np.mean([stops(tournament, rng, [0.6, 0.4, 0.0, 0.0], luck=0.5) for _ in range(100)])
+
+    assert rate >= 0.9
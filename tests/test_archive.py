@@ -0,0 +1,67 @@
+import os
+
+import pytest
+
+from archive import Archive
+from neuro_evolution.mutation import Mutation
+from tests.conftest import grow
+
+
+def generation(population, number):
+    # every generation mutates the population, so each archived record holds different genomes
+    for k, genotype in enumerate(population.genetics):
+        Mutation.instance.mutate_all(genotype)
+        genotype.fitness = number + k / 10.0
+
+    return [(genotype.pack(), genotype.fitness) for s in population.species for genotype in s.members]
+
+
+def assert_archived(archive, number, expected):
+    assert archive.genomes(number) == len(expected)
+    for k, (packed, fitness) in enumerate(expected):
+        genotype = archive.genome(number, k)
+        assert (genotype.pack(), genotype.fitness) == (packed, fitness)
+
+    with pytest.raises(IndexError):
+        archive.genome(number, len(expected))
+
+
+def test_archive_reads_back_across_reopens_and_torn_index(evolution, tmp_path):
+    path = str(tmp_path / "population.archive")
+    evolution.genetics.extend(grow(12, rounds=3))
+    evolution.speciate(evolution.genetics)
+
+    expected = {}
+    reader = Archive(path)
+    for number in range(3):
+        expected[number] = generation(evolution, number)
+        Archive(path).append(number, evolution.species)
+
+        # a reader that is already open picks up the records appended since it last looked
+        assert reader.generations() == list(range(number + 1))
+        assert_archived(reader, number, expected[number])
+    reader.close()
+
+    reopened = Archive(path)
+    assert [top_fitness for top_fitness, _, _, _ in reopened.species(1)] == [s.topFitness for s in evolution.species]
+    for number in range(3):
+        assert_archived(reopened, number, expected[number])
+    reopened.close()
+
+    # a crash halfway through the last index entry loses that generation and nothing before it
+    size = os.path.getsize(path + ".index")
+    with open(path + ".index", "r+b") as file:
+        file.truncate(size - Archive.INDEX.size // 2)
+
+    torn = Archive(path)
+    assert torn.generations() == [0, 1]
+    torn.close()
+
+    expected[3] = generation(evolution, 3)
+    Archive(path).append(3, evolution.species)
+
+    recovered = Archive(path)
+    assert recovered.generations() == [0, 1, 3]
+    for number in (0, 1, 3):
+        assert_archived(recovered, number, expected[number])
+    recovered.close()
@@ -0,0 +1,37 @@
+import random
+
+import pytest
+
+from neuro_evolution.mutation import Mutation
+from neuro_evolution.population import Population
+from tests.conftest import grow
+
+
+def breed(population, workers, structural):
+    parents = grow(12, rounds=4)
+    if not structural:
+        Mutation.instance.MUTATE_LINK = 0
+        Mutation.instance.MUTATE_NODE = 0
+        Mutation.instance.MUTATE_ENABLE = 0
+        Mutation.instance.MUTATE_DISABLE = 0
+
+    known = len(Mutation.instance.historical)
+    random.seed(1)
+    plans = [((random.choice(parents), random.choice(parents)) if k % 2 else (random.choice(parents),),
+              random.getrandbits(32)) for k in range(40)]
+
+    population.BREED_WORKERS = workers
+    children = population.breed(plans)
+    population.stop_workers()
+
+    # new links are numbered after breeding, so the markings they added must line up as well
+    return [child.pack() for child in children], Mutation.instance.export_markings(known)
+
+
+@pytest.mark.parametrize('structural', [False, True])
+def test_worker_count_does_not_change_offspring(evolution, structural):
+    serial = breed(evolution, 1, structural)
+    parallel = breed(evolution, 4, structural)
+
+    assert parallel == serial
+    assert structural == (len(serial[1]) > 0)
@@ -0,0 +1,133 @@
+import os
+import random
+import struct
+
+import pytest
+
+import checkpoint
+from checkpoint import Checkpoint, DeltaCheckpoint
+from neuro_evolution.genotype import VertexInfo
+from neuro_evolution.mutation import Mutation
+from neuro_evolution.population import Population
+from tests.conftest import grow
+from tournament import Tournament
+
+LEGACY = os.path.join(os.path.dirname(__file__), "data", "legacy_population.txt")
+
+
+def genes(genotype):
+    return ([(vertex.type, vertex.index) for vertex in genotype.vertices],
+            [(edge.source, edge.destination, edge.weight, edge.enabled, edge.innovation) for edge in genotype.edges])
+
+
+def snapshot(species):
+    return [(top_fitness, staleness, [(genotype.id, genotype.pack()) for genotype in members])
+            for top_fitness, staleness, members in species]
+
+
+def live():
+    return snapshot((s.topFitness, s.staleness, s.members) for s in Population.instance.species)
+
+
+def assert_journal_holds_population(path, tournament):
+    state = DeltaCheckpoint.read(path)
+
+    assert state.generation == Population.instance.GENERATION
+    assert state.champion_score == tournament.champion_score
+    assert state.markings == Mutation.instance.export_markings()
+    assert snapshot(state.species) == live()
+
+
+def advance(population, tournament, newcomers):
+    # a generation in miniature: some genomes mutate, one is replaced and the counters move on
+    for s in population.species:
+        for genotype in random.sample(s.members, len(s.members) // 2):
+            Mutation.instance.mutate_all(genotype)
+        s.staleness += 1
+
+    species = random.choice(population.species)
+    species.members[-1] = newcomers.pop()
+    population.GENERATION += 1
+    tournament.champion_score += 1.5
+
+
+def test_journal_replays_to_the_live_population(evolution, tmp_path):
+    path = str(tmp_path / "population.journal")
+    genotypes = grow(24, rounds=3)
+    newcomers = genotypes[16:]
+    evolution.speciate(genotypes[:16])
+    tournament = Tournament()
+    journal = DeltaCheckpoint(path, compact=3)
+
+    # seven saves cover two compactions and the deltas appended after each
+    for _ in range(7):
+        journal.save(tournament)
+        assert_journal_holds_population(path, tournament)
+        advance(evolution, tournament, newcomers)
+
+
+def test_failed_append_is_written_again(evolution, tmp_path, monkeypatch):
+    path = str(tmp_path / "population.journal")
+    genotypes = grow(20, rounds=3)
+    newcomers = genotypes[16:]
+    evolution.speciate(genotypes[:16])
+    tournament = Tournament()
+    journal = DeltaCheckpoint(path, compact=10)
+
+    journal.save(tournament)
+    advance(evolution, tournament, newcomers)
+
+    def full_disk(*args):
+        raise OSError("no space left on device")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(checkpoint, "open", full_disk, raising=False)
+        with pytest.raises(OSError):
+            journal.save(tournament)
+
+    advance(evolution, tournament, newcomers)
+    journal.save(tournament)
+    assert_journal_holds_population(path, tournament)
+
+
+def test_legacy_text_is_read_field_by_field():
+    state = Checkpoint.read_legacy(LEGACY)
+
+    assert state.generation == 7
+    assert state.champion_score == 42.5
+    assert struct.unpack(f'<{len(state.markings) // 4}i', state.markings) == \
+        (0, 0, 3, 1, 1, 3, 2, 0, 4, 3, 1, 4, 4, 0, 5, 5, 5, 3, 6, 2, 4)
+    assert [(top_fitness, staleness, len(members)) for top_fitness, staleness, members in state.species] == \
+        [(12.5, 2, 2), (3.0, 1, 1)]
+
+    first, second = state.species[0][2]
+    inputs = [(VertexInfo.EType.INPUT, i) for i in range(3)]
+    outputs = [(VertexInfo.EType.OUTPUT, 3), (VertexInfo.EType.OUTPUT, 4)]
+
+    # 'False' is a non-empty string, so the enabled flags only survive when compared against 'True'
+    assert genes(first) == (inputs + outputs, [(0, 3, 0.5, True, 0), (1, 3, -1.25, False, 1),
+                                               (0, 4, 2.0, True, 2), (1, 4, 0.75, True, 3)])
+    assert genes(second) == (inputs + outputs + [(VertexInfo.EType.HIDDEN, 5)],
+                             [(0, 3, 0.5, False, 0), (1, 3, -1.25, True, 1), (0, 5, 1.0, True, 4),
+                              (5, 3, -0.5, True, 5)])
+    assert [edge.enabled for edge in state.species[1][2][0].edges] == [True, False]
+
+
+def test_converted_checkpoint_round_trips_byte_for_byte(tmp_path):
+    converted = str(tmp_path / "population.bin")
+    rewritten = str(tmp_path / "rewritten.bin")
+
+    Checkpoint.convert(LEGACY, converted)
+    legacy = Checkpoint.read_legacy(LEGACY)
+    state = Checkpoint.read(converted)
+
+    assert (state.generation, state.champion_score, bytes(state.markings)) == \
+        (legacy.generation, legacy.champion_score, legacy.markings)
+    assert [(top_fitness, staleness, [genes(genotype) for genotype in members])
+            for top_fitness, staleness, members in state.species] == \
+        [(top_fitness, staleness, [genes(genotype) for genotype in members])
+         for top_fitness, staleness, members in legacy.species]
+
+    Checkpoint.write(rewritten, state)
+    with open(converted, "rb") as first, open(rewritten, "rb") as second:
+        assert first.read() == second.read()
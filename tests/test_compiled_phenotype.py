@@ -0,0 +1,40 @@
+import random
+
+import pytest
+
+from neuro_evolution.network_factory import NetworkFactory
+from neuro_evolution.phenotype import Phenotype
+from tests.conftest import grow
+
+
+def engines(genotype):
+    loop = Phenotype()
+    loop.inscribe_genotype(genotype)
+    loop.process_graph()
+    return loop, NetworkFactory.create_phenotype(genotype)
+
+
+def assert_same_outputs(genotype, inputs, calls=5):
+    loop, compiled = engines(genotype)
+    rng = random.Random(1)
+
+    # consecutive calls carry activations over, so they also check the state both engines keep
+    for _ in range(calls):
+        X = [rng.random() for _ in range(inputs)]
+        assert compiled.propagate(X) == pytest.approx(loop.propagate(X), abs=1e-12)
+
+    return compiled
+
+
+def test_compiled_engine_matches_loop_engine(evolution):
+    phenotypes = [assert_same_outputs(genotype, 8) for genotype in grow(30)]
+
+    assert any(phenotype.recurrent for phenotype in phenotypes)
+
+
+def test_compiled_engine_matches_loop_engine_on_a_cycle(evolution):
+    genotype = NetworkFactory.create_base_recurrent()
+    genotype.edges[0].weight = 1.5
+    genotype.edges[1].weight = -2.0
+
+    assert assert_same_outputs(genotype, 1).recurrent
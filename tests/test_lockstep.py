@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from lockstep import Lockstep
+from monopoly.board import Board
+from network_adapter import NetworkAdapter
+from neuro_evolution.network_factory import NetworkFactory
+from neuro_evolution.population_evaluator import PopulationEvaluator
+from rng import RNG
+from tests.conftest import grow
+from tournament import Tournament
+
+
+@pytest.fixture
+def capped(monkeypatch):
+    # games rarely end on their own, so every board is called a draw after a fixed number of turns
+    roll = Board.roll
+
+    def capped_roll(self):
+        self.turns = getattr(self, 'turns', 0) + 1
+        if self.turns > 40:
+            return Board.EOutcome.DRAW
+        return (yield from roll(self))
+
+    monkeypatch.setattr(Board, 'roll', capped_roll)
+
+
+def play(networks, games, lockstep):
+    sequence = np.random.SeedSequence(7)
+    boards = []
+    for n in range(games):
+        board = Tournament.prepare_board(Board(NetworkAdapter()), networks, RNG.child(sequence, n))
+        board.turns = 0
+        boards.append(board)
+
+    if lockstep is not None:
+        outcomes = lockstep.run(boards)
+    else:
+        outcomes = []
+        for board in boards:
+            # a lockstep seat starts every game from rest, so sequential play does too
+            for network in networks:
+                network.reset_graph()
+            outcomes.append(Tournament.play_game(board))
+
+    return outcomes, [(board.forward_passes(), [player.funds for player in board.players], list(board.owners))
+                      for board in boards]
+
+
+@pytest.mark.parametrize('evaluated', [False, True])
+def test_lockstep_plays_the_same_games_as_sequential_play(evolution, capped, evaluated):
+    networks = [NetworkFactory.create_phenotype(genotype)
+                for genotype in grow(4, Tournament.INPUTS, Tournament.OUTPUTS, rounds=40)]
+
+    assert any(network.recurrent for network in networks)
+
+    lockstep = Lockstep(PopulationEvaluator(networks) if evaluated else None)
+    assert play(networks, 6, lockstep) == play(networks, 6, None)
+    assert lockstep.evaluated > lockstep.batches
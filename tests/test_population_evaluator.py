@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from neuro_evolution.network_factory import NetworkFactory
+from neuro_evolution.population_evaluator import PopulationEvaluator
+from tests.conftest import grow
+
+
+def test_evaluator_matches_each_network_run_alone(evolution):
+    genotypes = grow(4, 16, 4, rounds=30) + grow(3, 16, 4, rounds=3)
+    networks = [NetworkFactory.create_phenotype(genotype) for genotype in genotypes]
+    evaluator = PopulationEvaluator(networks)
+    rng = np.random.default_rng(3)
+
+    assert any(network.recurrent for network in networks)
+    assert not all(network.recurrent for network in networks)
+
+    # rows keep their activations between calls, so each one is checked against a network carrying its own state
+    rows = rng.integers(0, len(networks), 12).tolist()
+    values = np.zeros((len(rows), evaluator.size))
+    states = [np.zeros(networks[g].compiled.size) for g in rows]
+
+    for _ in range(4):
+        X = rng.random((len(rows), 16))
+        Y = evaluator.evaluate(rows, X, values)
+
+        for r, g in enumerate(rows):
+            compiled = networks[g].compiled
+            compiled.values = states[r]
+            assert Y[r] == pytest.approx(compiled.propagate(X[r]), abs=1e-12)
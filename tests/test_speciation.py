@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from neuro_evolution.crossover import Crossover, Encoding
+from neuro_evolution.population import Species
+from tests.conftest import grow
+
+
+def one_at_a_time(species, genotypes):
+    # the loop speciate replaced: each genome is compared with every representative in turn
+    for genotype in genotypes:
+        for s in species:
+            if Crossover.instance.speciation_distance(s.members[0], genotype) < Crossover.DISTANCE:
+                s.members.append(genotype)
+                break
+        else:
+            new_species = Species()
+            new_species.members.append(genotype)
+            species.append(new_species)
+
+
+def test_distance_matrix_matches_pairwise_distance(evolution):
+    genotypes = grow(12, rounds=4) + grow(12, rounds=10, seed=1)
+    # the base edge always carries innovation 0, so a link that is later numbered 0 as well gives a duplicate
+    assert any(len(set(genotype.innovations)) < len(genotype.innovations) for genotype in genotypes)
+
+    encoding = Encoding(genotypes, Crossover.columns(genotypes))
+
+    distances = Crossover.instance.distance_matrix(encoding, range(len(genotypes)), encoding)
+
+    expected = [[Crossover.instance.speciation_distance(first, second) for second in genotypes]
+                for first in genotypes]
+    assert distances == pytest.approx(np.array(expected), abs=1e-9)
+
+
+def test_speciate_assigns_like_the_one_at_a_time_loop(evolution, monkeypatch):
+    genotypes = grow(60, rounds=8)
+    distances = [Crossover.instance.speciation_distance(genotypes[0], genotype) for genotype in genotypes]
+    monkeypatch.setattr(Crossover, "DISTANCE", float(np.median(distances)))
+
+    # the second call also checks joining species that already exist before the batch arrives
+    expected = []
+    one_at_a_time(expected, genotypes[:20])
+    one_at_a_time(expected, genotypes[20:])
+    evolution.speciate(genotypes[:20])
+    evolution.speciate(genotypes[20:])
+
+    assert len(expected) > 2
+    assert [[id(genotype) for genotype in s.members] for s in evolution.species] == \
+        [[id(genotype) for genotype in s.members] for s in expected]
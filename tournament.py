@@ -1,10 +1,18 @@
-import threading
-from typing import Optional, List
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from statistics import NormalDist
+from typing import Dict, Optional, List
 
-from analytics import Analytics
+import numpy as np
+
+from analytics import Analytics, History
+from lockstep import Lockstep
 from monopoly.board import Board
 from network_adapter import NetworkAdapter
+from neuro_evolution.network_factory import NetworkFactory
 from neuro_evolution.population import Population
+from neuro_evolution.population_evaluator import PopulationEvaluator
 from rng import RNG
 from neuro_evolution.genotype import Genotype
 from neuro_evolution.phenotype import Phenotype
@@ -12,22 +20,48 @@ from neuro_evolution.phenotype import Phenotype
 
 class Tournament:
     TOURNAMENT_SIZE: int = 256
-    ROUND_SIZE: int = 2000  # 2000
-    WORKERS: int = 20  # 20
+    ROUND_SIZE: int = 2000  # 2000, the most games a bracket may take
+    ADAPTIVE: bool = False  # stop a bracket as soon as its leader is significantly ahead of the runner-up
+    CONFIDENCE: float = 0.99  # over all the looks a bracket takes, not per look
+    MIN_GAMES: int = 200
+    WORKERS: int = os.cpu_count() or 1
     BATCH_SIZE: int = 20  # 20
+    LOCKSTEP: bool = True  # a batch's boards advance together and every round's forward passes are batched
+    SEEDED: bool = False  # common random numbers: every game stream is played four times with the seats rotated
+    CACHE_SIZE: int = 0  # 0 disables the per-network output cache
+    HISTORY: Optional[str] = None  # directory for per-bracket analytics columns; None disables
+    REPORTED_TILES: int = 5
     INPUTS: int = 126
     OUTPUTS: int = 9
 
+    # worker process state, rebuilt only when a new bracket arrives
+    worker_key = None
+    worker_networks: List[Phenotype] = []
+    worker_genomes: Dict[int, Genotype] = {}
+    WORKER_GENOMES: int = 2 * TOURNAMENT_SIZE  # genomes whose phenotypes a worker keeps between brackets
+    worker_evaluator: Optional[PopulationEvaluator] = None
+    worker_boards: List[Board] = []
+
     def __init__(self):
         self.champion: Optional[Genotype] = None
         self.champion_score = 0.0
         self.contestants: List[Phenotype] = []
         self.contestants_g: List[Genotype] = []
-        self.lock = threading.Lock()
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.history: Optional[History] = History(self.HISTORY) if self.HISTORY else None
 
     def initialise(self):
         Population.instance.generate_base_population(self.TOURNAMENT_SIZE, self.INPUTS, self.OUTPUTS)
 
+    def start_workers(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.WORKERS, initializer=Tournament.initialise_worker)
+
+    def stop_workers(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
     def execute_tournament(self):
         print("TOURNAMENT #" + str(Population.instance.GENERATION))
         self.contestants.clear()
@@ -60,21 +94,55 @@ class Tournament:
         self.contestants = cs
         self.contestants_g = cs_g
 
+        self.start_workers()
+
         for i in range(0, len(self.contestants), 4):
             played = 0
             print("BRACKET (" + str(i // 4) + ")")
-            while played < self.ROUND_SIZE:
-                print("Initialised Workers")
-                workers = []
-                for _ in range(self.WORKERS):
-                    worker = threading.Thread(target=self.play_game_thread, args=(i,))
-                    worker.start()
-                    workers.append(worker)
-                for worker in workers:
-                    worker.join()
-                played += self.WORKERS * self.BATCH_SIZE
-                for c in range(40):
-                    print("index:", c, ", {:.3f}".format(Analytics.instance.ratio[c]))
+            # workers keep a bracket's networks for as long as the same genomes keep arriving
+            key = tuple((genotype.id, genotype.version) for genotype in self.contestants_g[i:i + 4])
+            genomes = [self.contestants_g[i + j].pack() for j in range(4)]
+            stats = [0, 0, 0, 0]
+            counts = np.zeros((4, 40), dtype=np.int64)
+            totals = np.zeros(4)
+            moments = np.zeros((4, 4))
+            looked = 0
+            sequence = RNG.instance.spawn()
+            # the bracket is cut into the same batches whatever the worker count, and batches are taken as they finish
+            sizes = {}
+            size = self.batch_size()
+            for start in range(0, self.ROUND_SIZE, size):
+                games = min(size, self.ROUND_SIZE - start)
+                batch = self.executor.submit(Tournament.play_batch, key, genomes, games, self.LOCKSTEP,
+                                             self.CACHE_SIZE, sequence, start, self.SEEDED)
+                sizes[batch] = games
+            for batch in as_completed(sizes):
+                scores, products, counters, batch_stats = batch.result()
+                for j in range(4):
+                    self.contestants[i + j].score += scores[j]
+                totals += scores
+                moments += products
+                Analytics.instance.merge(counters)
+                counts += counters
+                for s in range(4):
+                    stats[s] += batch_stats[s]
+                played += sizes[batch]
+                if self.ADAPTIVE and played >= self.MIN_GAMES:
+                    if self.decided(totals, moments, played, looked, 4 if self.SEEDED else 1):
+                        for pending in sizes:
+                            pending.cancel()
+                        break
+                    looked = played
+            print(f"Games: {played} of {self.ROUND_SIZE}")
+            ratio = Analytics.instance.ratio
+            leaders = np.argsort(-ratio, kind="stable")[:self.REPORTED_TILES]
+            print("Win ratio: " + ", ".join(f"{c}:{ratio[c]:.3f}" for c in leaders))
+            if self.history is not None:
+                self.history.append(Population.instance.GENERATION, i // 4, played, counts)
+            hits, misses, passes, saved = stats
+            print(f"Decisions: {passes / played:.1f} forward passes, {saved / played:.1f} reused per game")
+            if self.CACHE_SIZE:
+                print(f"Cache: {hits} hits, {misses} misses, {hits / played:.1f} passes saved per game")
             mi: int = 0
             ms: float = self.contestants[i].score
             for j in range(1, 4):
@@ -86,45 +154,180 @@ class Tournament:
                     self.contestants_g[i + j].bracket += 1
                     continue
                 self.contestants[i + j] = None
+        if self.history is not None:
+            self.history.flush(f"{Population.instance.GENERATION:05d}_{len(self.contestants):03d}")
         self.contestants = [contestant for contestant in self.contestants if contestant is not None]
         self.contestants_g = [contestant_g for contestant_g in self.contestants_g if contestant_g is not None]
 
-    def play_game_thread(self, i):
-        for _ in range(self.BATCH_SIZE):
-            adapter = NetworkAdapter()
-            board = Board(adapter)
-            for j in range(4):
-                board.players[j].network = self.contestants[i + j]
-                board.players[j].adapter = adapter
-            board.players = RNG.instance.shuffle_neural_players(board.players)
-            outcome = Board.EOutcome.ONGOING
-            while outcome == Board.EOutcome.ONGOING:
-                outcome = board.step()
-            if outcome == Board.EOutcome.WIN1:
-                with self.lock:
-                    board.players[0].network.score += 1.0
-                for b in board.players[0].items:
-                    with self.lock:
-                        Analytics.instance.mark_win(b)
-            elif outcome == Board.EOutcome.WIN2:
-                with self.lock:
-                    board.players[1].network.score += 1.0
-                for b in board.players[1].items:
-                    with self.lock:
-                        Analytics.instance.mark_win(b)
-            elif outcome == Board.EOutcome.WIN3:
-                with self.lock:
-                    board.players[2].network.score += 1.0
-                for b in board.players[2].items:
-                    with self.lock:
-                        Analytics.instance.mark_win(b)
-            elif outcome == Board.EOutcome.WIN4:
-                with self.lock:
-                    board.players[3].network.score += 1.0
-                for b in board.players[3].items:
-                    with self.lock:
-                        Analytics.instance.mark_win(b)
-            elif outcome == Board.EOutcome.DRAW:
-                for player in board.players:
-                    with self.lock:
-                        player.network.score += 0.25
+    def spent(self, games):
+        # O'Brien-Fleming-type alpha spending: early looks get almost none of the error budget, all of it is spent
+        # by ROUND_SIZE games
+        if games <= 0:
+            return 0.0
+
+        normal = NormalDist()
+        boundary = normal.inv_cdf(1.0 - (1.0 - self.CONFIDENCE) / 2.0)
+        return 2.0 - 2.0 * normal.cdf(boundary / math.sqrt(min(games / self.ROUND_SIZE, 1.0)))
+
+    def batch_size(self):
+        # seeded batches hold whole groups of rotations, so no group is split between two workers
+        if self.SEEDED:
+            return -(-self.BATCH_SIZE // 4) * 4
+        return self.BATCH_SIZE
+
+    def decided(self, totals, moments, games, previous=0, group=1):
+        # z-test on the per-sample score difference between the leader and the runner-up, at the error budget spent
+        # between the previous look and this one; a sample is one game, or one group of games that share a stream
+        leader, runner = np.argsort(-totals, kind="stable")[:2]
+        samples = games / group
+        mean = (totals[leader] - totals[runner]) / samples
+        if mean <= 0.0:
+            return False
+
+        second = (moments[leader, leader] - 2.0 * moments[leader, runner] + moments[runner, runner]) / samples
+        variance = max(second - mean * mean, 0.0)
+        if variance == 0.0:
+            return True
+
+        # the leader is whichever of the pair is ahead, so the test is two-sided
+        p = 2.0 * (1.0 - NormalDist().cdf(mean / math.sqrt(variance / samples)))
+        return p < self.spent(games) - self.spent(previous)
+
+    @staticmethod
+    def initialise_worker():
+        # no RNG state is set up here: games only draw from the sequences play_batch is handed
+        Analytics()
+
+    @classmethod
+    def play_batch(cls, key, genomes, games, lockstep, cache_size, sequence, start=0, seeded=False):
+        if cls.worker_key != key:
+            cls.worker_networks = [cls.worker_phenotype(identity, packed) for identity, packed in zip(key, genomes)]
+            cls.worker_key = key
+
+            if cache_size:
+                for network in cls.worker_networks:
+                    if network.cache is None:
+                        network.enable_cache(cache_size)
+
+            cls.worker_evaluator = PopulationEvaluator(cls.worker_networks) if lockstep else None
+
+        networks = cls.worker_networks
+        for network in networks:
+            network.score = 0.0
+
+        while len(cls.worker_boards) < games:
+            cls.worker_boards.append(Board(NetworkAdapter()))
+
+        # game n of a bracket plays stream n of the bracket's sequence no matter which worker runs it;
+        # seeded brackets replay stream n // 4 with the seats rotated by n % 4 instead
+        if seeded:
+            boards = [cls.prepare_board(board, networks, RNG.child(sequence, n // 4), n % 4)
+                      for n, board in enumerate(cls.worker_boards[:games], start)]
+        else:
+            boards = [cls.prepare_board(board, networks, RNG.child(sequence, n))
+                      for n, board in enumerate(cls.worker_boards[:games], start)]
+        if lockstep:
+            outcomes = Lockstep(cls.worker_evaluator).run(boards)
+        else:
+            outcomes = [cls.play_game(board) for board in boards]
+
+        passes = 0
+        saved = 0
+        scores = np.zeros((games, 4))
+        for k, (board, outcome) in enumerate(zip(boards, outcomes)):
+            before = np.array([network.score for network in networks])
+            cls.record_outcome(board, outcome)
+            scores[k] = np.array([network.score for network in networks]) - before
+            board_passes, board_saved = board.forward_passes()
+            passes += board_passes
+            saved += board_saved
+
+        hits = 0
+        misses = 0
+        for network in networks:
+            if network.cache is not None:
+                counters = network.cache.collect()
+                hits += counters[0]
+                misses += counters[1]
+
+        # sums of products of per-sample scores give the variance of any pairwise score difference
+        samples = cls.samples(scores, start, seeded)
+        return ([network.score for network in networks], samples.T @ samples, Analytics.instance.collect(),
+                (hits, misses, passes, saved))
+
+    @staticmethod
+    def samples(scores, start=0, seeded=False):
+        # the rotations of a seeded stream share their dice, so a group of them is one sample rather than four
+        if not seeded:
+            return scores
+        groups = [k for k, n in enumerate(range(start, start + len(scores))) if k == 0 or n % 4 == 0]
+        return np.add.reduceat(scores, groups)
+
+    @classmethod
+    def worker_phenotype(cls, identity, packed):
+        # a genome seen before is reused as is, or has its weights patched when only weights changed
+        number, version = identity
+        cached = cls.worker_genomes.pop(number, None)
+
+        if cached is not None and cached.version == version:
+            genotype = cached
+            genotype.phenotype.reset_graph()
+        else:
+            genotype = Genotype.unpack(packed)
+            genotype.id = number
+            genotype.version = version
+
+            if cached is not None and all(packed[c] == column for c, column in enumerate(cached.pack()) if c != 4):
+                changed = np.flatnonzero(np.frombuffer(genotype.weights) != np.frombuffer(cached.weights))
+                genotype.phenotype = cached.phenotype
+                genotype.reshaped = False
+                genotype.reweighted = set(changed.tolist())
+
+            NetworkFactory.refresh_phenotype(genotype)
+
+        cls.worker_genomes[number] = genotype
+        while len(cls.worker_genomes) > cls.WORKER_GENOMES:
+            del cls.worker_genomes[next(iter(cls.worker_genomes))]
+
+        return genotype.phenotype
+
+    @staticmethod
+    def prepare_board(board, networks, sequence=None, rotation=None):
+        board.reset(sequence)
+        for j in range(4):
+            board.players[j].network = networks[j]
+            board.players[j].adapter = board.adapter
+        if rotation is None:
+            board.players = RNG.instance.shuffle_neural_players(board.players, board.gen)
+        else:
+            board.players = board.players[rotation:] + board.players[:rotation]
+        return board
+
+    @staticmethod
+    def play_game(board):
+        outcome = Board.EOutcome.ONGOING
+        while outcome == Board.EOutcome.ONGOING:
+            outcome = board.step()
+        return outcome
+
+    @staticmethod
+    def record_outcome(board, outcome):
+        if outcome == Board.EOutcome.WIN1:
+            board.players[0].network.score += 1.0
+            for b in board.players[0].items:
+                Analytics.instance.mark_win(b)
+        elif outcome == Board.EOutcome.WIN2:
+            board.players[1].network.score += 1.0
+            for b in board.players[1].items:
+                Analytics.instance.mark_win(b)
+        elif outcome == Board.EOutcome.WIN3:
+            board.players[2].network.score += 1.0
+            for b in board.players[2].items:
+                Analytics.instance.mark_win(b)
+        elif outcome == Board.EOutcome.WIN4:
+            board.players[3].network.score += 1.0
+            for b in board.players[3].items:
+                Analytics.instance.mark_win(b)
+        elif outcome == Board.EOutcome.DRAW:
+            for player in board.players:
+                player.network.score += 0.25